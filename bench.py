@@ -0,0 +1,161 @@
+"""
+Headless benchmark suite.
+
+Builds each scenario preset in a fresh world, runs it for a number of ticks
+without a window and prints one JSON object per scenario, e.g.
+
+    python bench.py --ticks 300 --engine numpy --out bench.jsonl
+"""
+
+import argparse, json, time, tracemalloc
+import pygame
+import numpy as np
+import main
+
+
+# Solid walls around the world so nothing falls off
+def walls(width, height):
+    for x in range(width):
+        main.place_cell("solid", x, height - 1)
+    for y in range(height - 1):
+        main.place_cell("solid", 0, y)
+        main.place_cell("solid", width - 1, y)
+
+
+def fill(cell_type, x0, y0, x1, y1):
+    xs, ys = np.meshgrid(np.arange(x0, x1), np.arange(y0, y1), indexing="ij")
+    main.place_cells(cell_type, xs.ravel(), ys.ravel())
+
+
+# A block of sand dropping onto a slope
+def sand_avalanche(width, height):
+    walls(width, height)
+    for x in range(1, width - 1):
+        for y in range(height - 1 - x * height // (2 * width), height - 1):
+            main.place_cell("solid", x, y)
+    fill("sand", width // 8, 0, width // 2, height // 3)
+
+
+# A tank of water poured in from the top
+def water_tank(width, height):
+    walls(width, height)
+    fill("water", width // 4, 0, width // 2, height // 2)
+
+
+# Rows of trees with fire lit at their roots
+def forest_fire(width, height):
+    walls(width, height)
+    for x in range(4, width - 4, 8):
+        fill("wood", x, height // 2, x + 2, height - 1)  # Trunk
+        fill("wood", x - 2, height // 3, x + 4, height // 2)  # Leaves
+        main.place_cell("fire", x - 1, height - 2)
+
+
+# A pool of acid eating through a wooden floor
+def acid_bath(width, height):
+    walls(width, height)
+    fill("wood", 1, height * 2 // 3, width - 1, height - 1)
+    fill("acid", 1, height // 3, width - 1, height * 2 // 3)
+
+
+SCENARIOS = {
+    "sand_avalanche": sand_avalanche,
+    "water_tank": water_tank,
+    "forest_fire": forest_fire,
+    "acid_bath": acid_bath,
+}
+
+
+def particle_count():
+    count = main.store.count
+    if main.engine is not None:
+        count += int((main.engine.kind != 0).sum())
+    return count
+
+
+def run(scenario, ticks, width, height, sim_engine, seed, sparse=False):
+    """
+    Run one scenario and get its results."""
+    main.new_world(width, height, sim_engine, seed, sparse)
+    SCENARIOS[scenario](width, height)
+    particles = particle_count()
+
+    screen = pygame.Surface((width * main.CELL_SIZE, height * main.CELL_SIZE))
+    tick_time = 0
+    render_time = 0
+    updates = 0
+    for _ in range(ticks):
+        start = time.perf_counter()
+        updates += main.tick()
+        tick_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        main.renderer.draw(screen, main.engine)
+        render_time += time.perf_counter() - start
+
+    return {
+        "scenario": scenario,
+        "engine": sim_engine,
+        "width": width,
+        "height": height,
+        "ticks": ticks,
+        "seed": seed,
+        "sparse": sparse,
+        "particles": particles,
+        "ticks_per_sec": ticks / tick_time,
+        "particle_updates_per_sec": updates / tick_time,
+        "render_ms": render_time / ticks * 1000,
+        "pools": main.pool_stats(),
+    }
+
+
+def peak_memory(scenario, ticks, width, height, sim_engine, seed, sparse=False):
+    """
+    Run the scenario again with tracemalloc on and get the peak memory in MB.
+    Done separately since tracing slows everything down."""
+    tracemalloc.start()
+    run(scenario, ticks, width, height, sim_engine, seed, sparse)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append")
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--width", type=int, default=256)
+    parser.add_argument("--height", type=int, default=192)
+    parser.add_argument(
+        "--engine", choices=["objects", "numpy", "parallel"], default="objects"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--sparse", action="store_true", help="store the world in chunks (objects engine)"
+    )
+    parser.add_argument("--no-memory", action="store_true", help="skip the memory run")
+    parser.add_argument("--out", help="append the results to this JSON lines file")
+    args = parser.parse_args()
+
+    for scenario in args.scenario or SCENARIOS:
+        options = (
+            scenario,
+            args.ticks,
+            args.width,
+            args.height,
+            args.engine,
+            args.seed,
+            args.sparse,
+        )
+        result = run(*options)
+        if not args.no_memory:
+            result["peak_memory_mb"] = peak_memory(*options)
+        line = json.dumps(result)
+        print(line)
+        if args.out:
+            with open(args.out, "a") as file:
+                file.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main_cli()
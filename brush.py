@@ -0,0 +1,47 @@
+import numpy as np
+
+
+# What the mouse paints with: a circle or square of cells radius cells out
+# from the middle (radius 0 is one cell)
+# A stroke covers the brush at every cell along the line between two mouse
+# positions, so fast strokes leave no gaps
+class Brush:
+    SHAPES = ("circle", "square")
+    MAX_RADIUS = 64
+
+    def __init__(self, radius: int = 0, shape: str = "circle") -> None:
+        if shape not in self.SHAPES:
+            raise ValueError(f"unknown brush shape {shape!r}")
+        self.radius = radius
+        self.shape = shape
+        self._footprint = None  # (radius, shape, offsets) last made
+
+    def resize(self, change: int) -> None:
+        self.radius = min(self.MAX_RADIUS, max(0, self.radius + change))
+
+    # Switches to the next shape
+    def cycle(self) -> None:
+        self.shape = self.SHAPES[(self.SHAPES.index(self.shape) + 1) % len(self.SHAPES)]
+
+    # Gets the (dx, dy) offsets the brush covers around its middle
+    def footprint(self):
+        if self._footprint is None or self._footprint[:2] != (self.radius, self.shape):
+            side = np.arange(-self.radius, self.radius + 1)
+            dx, dy = np.meshgrid(side, side, indexing="ij")
+            if self.shape == "circle":
+                # The half keeps the edges from being single cells sticking out
+                inside = dx**2 + dy**2 <= (self.radius + 0.5) ** 2
+                dx, dy = dx[inside], dy[inside]
+            self._footprint = (self.radius, self.shape, (dx.ravel(), dy.ravel()))
+        return self._footprint[2]
+
+    # Gets the (xs, ys) positions the brush covers going from start to end
+    # (world positions, they can be outside the world and repeat)
+    def stroke(self, start: tuple[int, int], end: tuple[int, int]):
+        (x0, y0), (x1, y1) = start, end
+        steps = max(abs(x1 - x0), abs(y1 - y0))
+        along = np.linspace(0, 1, steps + 1)
+        middle_x = np.rint(x0 + (x1 - x0) * along).astype(np.intp)
+        middle_y = np.rint(y0 + (y1 - y0) * along).astype(np.intp)
+        dx, dy = self.footprint()
+        return (middle_x[:, None] + dx).ravel(), (middle_y[:, None] + dy).ravel()
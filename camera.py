@@ -0,0 +1,64 @@
+import math
+
+
+# Which part of the world is on the screen
+# x and y are the world position (in cells) at the top left corner of the
+# screen and zoom is how many pixels wide a cell is drawn
+class Camera:
+    MIN_ZOOM = 1
+    MAX_ZOOM = 40
+
+    def __init__(self, screen_size: tuple[int, int], zoom: int) -> None:
+        self.screen_size = screen_size
+        self.world_shape = (0, 0)
+        self.zoom = zoom
+        self.x = 0.0
+        self.y = 0.0
+
+    # Points the camera at a new world (keeping it inside it)
+    def set_world(self, shape: tuple[int, int]) -> None:
+        self.world_shape = shape
+        self.clamp()
+
+    # Gets the cell under a point on the screen
+    def to_world(self, px: float, py: float) -> tuple[int, int]:
+        return math.floor(self.x + px / self.zoom), math.floor(self.y + py / self.zoom)
+
+    # Gets where a world position is drawn on the screen
+    def to_screen(self, x: float, y: float) -> tuple[int, int]:
+        return round((x - self.x) * self.zoom), round((y - self.y) * self.zoom)
+
+    # Gets the (x, y) slices of the cells that are at least partly on screen
+    def window(self) -> tuple[slice, slice]:
+        width, height = self.world_shape
+        x0 = max(0, math.floor(self.x))
+        y0 = max(0, math.floor(self.y))
+        x1 = min(width, math.ceil(self.x + self.screen_size[0] / self.zoom))
+        y1 = min(height, math.ceil(self.y + self.screen_size[1] / self.zoom))
+        return slice(x0, max(x0, x1)), slice(y0, max(y0, y1))
+
+    # Moves the camera by a number of pixels
+    def pan(self, dx: float, dy: float) -> None:
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.clamp()
+
+    # Zooms in (positive steps) or out keeping the cell under the point in place
+    def zoom_at(self, px: float, py: float, steps: int) -> None:
+        x = self.x + px / self.zoom
+        y = self.y + py / self.zoom
+        zoom = self.zoom
+        for _ in range(abs(steps)):
+            # Steps get bigger as the cells do, so zooming feels even
+            change = max(1, zoom // 4)
+            zoom = zoom + change if steps > 0 else zoom - change
+        self.zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, zoom))
+        self.x = x - px / self.zoom
+        self.y = y - py / self.zoom
+        self.clamp()
+
+    # Keeps the view inside the world (at the top left when the world is smaller)
+    def clamp(self) -> None:
+        width, height = self.world_shape
+        self.x = min(max(0.0, self.x), max(0.0, width - self.screen_size[0] / self.zoom))
+        self.y = min(max(0.0, self.y), max(0.0, height - self.screen_size[1] / self.zoom))
@@ -1,5 +1,14 @@
+from array import array
 from typing import Optional
-import pygame, random
+import pygame
+import numpy as np
+from store import CellStore
+from chunks import ChunkMap
+from pool import CellPool
+from sparse import ChunkedArray
+from perf import profiler
+from rng import RandomPool
+from materials import Material, REGISTRY, register, update_order
 
 
 EMPTY_LAYER = 0
@@ -8,52 +17,334 @@ SAND_LAYER = 2
 WATER_LAYER = 3
 FIRE_LAYER = 4
 SMOKE_LAYER = 5
+LAYER_COUNT = 6
+OUTSIDE = -1  # Value of the border around the grid
 
+# Holds the attributes of every cell, the cell objects are views into it
+store = CellStore()
+# Tracks which parts of the world are awake (sized by main)
+chunks = ChunkMap()
+# Random numbers for the rules (seeded by main)
+randoms = RandomPool()
 
+
+# Which cell owns each grid position: the cell's slot + 1 (0 = nobody)
+# Every move, spawn and remove keeps this and the grid in sync, so every
+# non-empty grid position belongs to exactly one cell or engine particle
+owners = np.zeros((0, 0), dtype=np.int32)
+# Health left of the wood at each position (0 = no wood), burnt and eaten
+# away by the combustion module
+health = np.zeros((0, 0), dtype=np.int16)
+# How much hotter than the air each position is, spread around by the heat
+# module. A view into heat_padded, which has a border at air temperature
+heat_padded = np.zeros((2, 2), dtype=np.float32)
+temperature = heat_padded[1:-1, 1:-1]
+# Cells on the empty layer (e.g. destroy) that other cells can move over
+markers: dict[tuple[int, int], "Cell"] = {}
+# Array engine sharing the grid (if any), cells swap places with its particles
+particles = None
+
+# The grid with a one cell border of OUTSIDE around it (set by attach_world)
+padded = np.full((2, 2), OUTSIDE, dtype=np.int8)
+# Positions (in padded coordinates) whose neighbors changed since the last
+# gather_neighbors call are set to stamp. Stamps count 1 to 255 and start over,
+# a position last marked 255 calls ago only gets its neighbors read again
+# One byte per position, in a flat array of the padded grid's rows laid end to
+# end (stale_rows long each) since it's only ever read and written a few items
+# at a time. A sparse world has a ChunkedArray instead (stale_rows = 0)
+stale = array("B")
+stale_rows = 0
+stamp = 0
+marks = array("B", bytes(3))  # Three stamps, written by _touch
+
+# What the rules know about the 3x3 area around a cell, packed into one int
+# (its neighborhood code). Each direction has a bit
+# 0 1 2
+# 3 8 4
+# 5 6 7
+# which is set where the cell can move. The same bits shifted by OUTSIDE_SHIFT,
+# EMPTY_SHIFT and SAME_SHIFT are set where it's outside the grid, empty, and
+# on the cell's own layer
+UP_LEFT, UP, UP_RIGHT, LEFT, RIGHT = 1, 2, 4, 8, 16
+DOWN_LEFT, DOWN, DOWN_RIGHT, CENTER = 32, 64, 128, 256
+OUTSIDE_SHIFT = 9
+EMPTY_SHIFT = 18
+SAME_SHIFT = 27
+
+# Offsets of the 3x3 area in the padded grid, in direction bit order
+_AROUND_X = np.array([0, 1, 2, 0, 2, 0, 1, 2, 1])
+_AROUND_Y = np.array([0, 0, 0, 1, 1, 2, 2, 2, 1])
+_BITS = 1 << np.arange(9, dtype=np.int64)
+
+
+# Gets the cell that owns the position, if any
+def cell_at(x: int, y: int) -> Optional["Cell"]:
+    if x < 0 or y < 0 or x >= owners.shape[0] or y >= owners.shape[1]:
+        return None
+    owner = owners.item(x, y)
+    return store.views[owner - 1] if owner else None
+
+
+# Gets the empty layer cell at the position, if any
+def marker_at(x: int, y: int) -> Optional["Cell"]:
+    return markers.get((x, y))
+
+
+# Makes a grid of the shape with a border of OUTSIDE around it, so reading
+# around any cell never needs bounds checks. The border is put in the padded
+# array if one is given. Returns the padded array and the grid (a view into it)
+# A sparse grid only stores the chunks that aren't empty
+def new_grid(shape: tuple[int, int], padded_grid=None, sparse: bool = False):
+    padded_shape = (shape[0] + 2, shape[1] + 2)
+    if sparse:
+        padded_grid = ChunkedArray(padded_shape, np.int8, EMPTY_LAYER)
+        everything = slice(None)
+        for border in ((0, everything), (-1, everything), (everything, 0), (everything, -1)):
+            padded_grid[border] = OUTSIDE
+        return padded_grid, padded_grid.window(1, 1, shape)
+    if padded_grid is None:
+        padded_grid = np.empty(padded_shape, dtype=np.int8)
+    padded_grid[:] = OUTSIDE
+    grid = padded_grid[1:-1, 1:-1]
+    grid[:] = EMPTY_LAYER
+    return padded_grid, grid
+
+
+# Removes every cell and sizes the owners and chunks for a new world
+# (sparse ones for a sparse grid)
+def reset_cells(shape: tuple[int, int], sparse: bool = False) -> None:
+    global owners, particles, stale, stale_rows, health, heat_padded, temperature
+    store.clear()
+    if sparse:
+        owners = ChunkedArray(shape, np.int32)
+        health = ChunkedArray(shape, np.int16)
+        heat_padded = ChunkedArray((shape[0] + 2, shape[1] + 2), np.float32)
+        temperature = heat_padded.window(1, 1, shape)
+        stale = ChunkedArray((shape[0] + 2, shape[1] + 2), np.uint8)
+        stale_rows = 0
+    else:
+        owners = np.zeros(shape, dtype=np.int32)
+        health = np.zeros(shape, dtype=np.int16)
+        heat_padded = np.zeros((shape[0] + 2, shape[1] + 2), dtype=np.float32)
+        temperature = heat_padded[1:-1, 1:-1]
+        stale = array("B", bytes((shape[0] + 2) * (shape[1] + 2)))
+        stale_rows = shape[1] + 2
+    markers.clear()
+    chunks.reset(shape)
+    particles = None
+    for pool in POOLS:
+        pool.reset()
+
+
+# Connects the cells to the world's padded grid (from new_grid) and to the
+# array engine, if any, so they can swap places with its particles
+def attach_world(padded_grid, engine=None) -> None:
+    global padded, particles
+    padded = padded_grid
+    particles = engine
+
+
+# Gets the neighborhood codes (as neighbors() would) of the cells in the slots,
+# all on the layer, all at once
+# Codes stay good for each cell until something moves next to it, which
+# neighbors() checks before using them
+# Slots change as cells are removed, so they have to be read right before
+def gather_neighbors(slots, layer: int) -> list[int]:
+    global stamp, marks
+    stamp = stamp % 255 + 1
+    marks = array("B", (stamp, stamp, stamp))
+    around = padded[store.x[slots][:, None] + _AROUND_X, store.y[slots][:, None] + _AROUND_Y]
+    codes = MOVES[layer][around] @ _BITS
+    codes |= ((around == OUTSIDE) @ _BITS) << OUTSIDE_SHIFT
+    codes |= ((around == EMPTY_LAYER) @ _BITS) << EMPTY_SHIFT
+    codes |= ((around == layer) @ _BITS) << SAME_SHIFT
+    return codes.tolist()
+
+
+# Frees the chunks of a sparse world that emptied out (once per tick)
+# The stale marks can all go since every pass gathers its neighbors again
+def release_chunks() -> None:
+    if isinstance(owners, ChunkedArray):
+        padded.release()
+        owners.release()
+        health.release()
+        heat_padded.release()
+        stale.clear()
+
+
+# Marks the neighbors of the position as changed
+def _touch(x: int, y: int) -> None:
+    if stale_rows:
+        start = x * stale_rows + y
+        stale[start : start + 3] = marks
+        start += stale_rows
+        stale[start : start + 3] = marks
+        start += stale_rows
+        stale[start : start + 3] = marks
+    else:
+        stale[x][y : y + 3] = stamp
+        stale[x + 1][y : y + 3] = stamp
+        stale[x + 2][y : y + 3] = stamp
+
+
+# Checks that the grid, the owners and the cells agree (for debugging)
+# Raises an AssertionError describing the first problem found
+def validate(grid) -> None:
+    count = store.count
+    xs, ys = store.x[:count], store.y[:count]
+    layers = LAYERS[store.material[:count]]
+    owning = layers != EMPTY_LAYER
+    slots = np.flatnonzero(owning)
+
+    inside = (xs >= 0) & (ys >= 0) & (xs < grid.shape[0]) & (ys < grid.shape[1])
+    assert inside.all(), f"cells outside the grid: {np.flatnonzero(~inside)[:10]}"
+    wrong = owners[xs[slots], ys[slots]] != slots + 1
+    assert not wrong.any(), f"cells not owning their position: {slots[wrong][:10]}"
+    # Whole arrays (sparse ones are made dense for this)
+    all_owners, grid = np.asarray(owners), np.asarray(grid)
+    assert (all_owners > 0).sum() == len(slots), "positions owned by missing cells"
+    wrong = grid[xs[slots], ys[slots]] != layers[slots]
+    assert not wrong.any(), f"grid out of sync with cells: {slots[wrong][:10]}"
+
+    engine_owned = np.zeros(grid.shape, dtype=bool)
+    if particles is not None:
+        engine_owned = particles.kind != EMPTY_LAYER
+        assert not (engine_owned & (all_owners > 0)).any(), "cell and particle overlap"
+        wrong = grid[engine_owned] != particles.kind[engine_owned]
+        assert not wrong.any(), "grid out of sync with engine particles"
+    stray = (grid != EMPTY_LAYER) & (all_owners == 0) & ~engine_owned
+    assert not stray.any(), f"ghost cells at {np.argwhere(stray)[:10].tolist()}"
+
+
+# Makes a cell attribute that is stored in the cell store
+def _stored(name: str):
+    def get(self):
+        return getattr(store, name).item(self.slot)
+
+    def set(self, value) -> None:
+        getattr(store, name)[self.slot] = value
+
+    return property(get, set)
+
+
+# A cell object is a view into the cell store. Its type, layer and the layers
+# it can move into come from its material in the registry (see materials.py)
 class Cell:
-    def __init__(
-        self,
-        cell_type: str = "solid",
-        position: tuple[int, int] = (0, 0),
-        layer: int = 1,
-        ignore_layers: list[int] = [EMPTY_LAYER],
-    ) -> None:
-
-        self.cell_type = cell_type  # Type of cell (e.g. solid, sand, water)
+    __slots__ = ("slot",)
+
+    cell_type = "solid"  # Type of cell (e.g. solid, sand, water)
+    material = None  # Its Material, set when it's registered
+    cell_layer = SOLID_LAYER
+    # codes[layer]: the bits of its neighborhood code (see UP_LEFT) set by a
+    # neighbor on the layer, for the center; filled in from MOVES
+    codes = ()
+    pool = None  # Recycles the objects of removed cells of this type
+    draws = ()  # Streams of randoms the update reads (see RandomPool.deal)
+
+    lifetime = _stored("lifetime")
+    direction = _stored("direction")
+    chance = _stored("chance")
+    variation = _stored("variation")
+    cling_factor = _stored("cling_factor")
+    index = _stored("index")
+
+    def __new__(cls, *args, **kwargs):
+        if cls.pool is not None:
+            return cls.pool.take(cls)
+        return object.__new__(cls)
+
+    def __init__(self, position: tuple[int, int] = (0, 0)) -> None:
+        material = self.material
+        self.slot = store.add(self, material.id)
         self.position = position  # Position of the cell in the grid
-        self.cell_layer = layer
-        self.ignore_layers = ignore_layers
+        if material.variation:
+            shade = randoms.randrange(0, material.variation + 1)
+            self.color = tuple(max(0, value - shade) for value in material.color)
+        else:
+            self.color = material.color
+        if material.lifetime:
+            self.lifetime = material.lifetime
+
+    # Position of the cell in the grid
+    @property
+    def position(self) -> tuple[int, int]:
+        return (store.x.item(self.slot), store.y.item(self.slot))
+
+    @position.setter
+    def position(self, value: tuple[int, int]) -> None:
+        store.x[self.slot], store.y[self.slot] = value
+
+    @property
+    def color(self) -> tuple[int, int, int]:
+        return tuple(store.color[self.slot].tolist())
+
+    @color.setter
+    def color(self, value: tuple[int, int, int]) -> None:
+        store.color[self.slot] = value
+
+    # Whether the cell is still in the simulation
+    @property
+    def alive(self) -> bool:
+        return self.slot >= 0
 
     # Move the cell on the grid
-    def move(self, grid, dx: int, dy: int, fill_type=0) -> None:
-        grid[self.position[0]][self.position[1]] = fill_type
-        self.position = (self.position[0] + dx, self.position[1] + dy)
-        grid[self.position[0]][self.position[1]] = self.cell_layer
-
-    # Gets the neighbors of the cell
-    # 0 1 2
-    # 3 8 4
-    # 5 6 7
-    def neighbors(self, grid):
-        neighbors = []
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                if i == 0 and j == 0:
-                    continue
-                # Check if the neighbor is within bounds
-                if (
-                    self.position[0] + j < 0
-                    or self.position[0] + j >= len(grid)
-                    or self.position[1] + i < 0
-                    or self.position[1] + i >= len(grid[0])
-                ):
-                    neighbors.append(-1)
-                    continue
-
-                # Append neighbor cell
-                neighbors.append(int(grid[self.position[0] + j][self.position[1] + i]))
-        neighbors.append(int(grid[self.position[0]][self.position[1]]))
-        return neighbors
+    # Whatever was in the way (another cell or an engine particle) takes the
+    # cell's old place, so nothing is ever overwritten
+    def move(self, grid, dx: int, dy: int) -> None:
+        x, y = self.position
+        new_x, new_y = x + dx, y + dy
+        owner = owners.item(new_x, new_y)
+        if owner:
+            other = store.views[owner - 1]
+            other.position = (x, y)
+            owners[x, y] = owner
+            grid[x, y] = other.cell_layer
+            other.displaced(self)
+        elif particles is not None and particles.kind[new_x, new_y] != EMPTY_LAYER:
+            owners[x, y] = 0
+            particles.displace(new_x, new_y, x, y)
+        else:
+            owners[x, y] = 0
+            grid[x, y] = EMPTY_LAYER
+
+        self.position = (new_x, new_y)
+        owners[new_x, new_y] = self.slot + 1
+        grid[new_x, new_y] = self.cell_layer
+        chunks.wake(x, y)
+        chunks.wake(new_x, new_y)
+        _touch(x, y)
+        _touch(new_x, new_y)
+        profiler.moves += 1
+
+    # Called when another cell moves into this one and pushes it aside
+    def displaced(self, other: "Cell") -> None:
+        pass
+
+    # Gets the neighborhood code of the cell (see UP_LEFT and the rest)
+    # Uses the code from gather_neighbors if nothing moved around the cell since
+    # The grid is read through its padded border (the same memory)
+    def neighbors(self, grid, gathered=None) -> int:
+        x, y = self.position
+        if gathered is not None:
+            if stale_rows:
+                fresh = stale[(x + 1) * stale_rows + y + 1] != stamp
+            else:
+                fresh = stale.item(x + 1, y + 1) != stamp
+            if fresh:
+                return gathered
+        (a0, a3, a5), (a1, a8, a6), (a2, a4, a7) = padded[x : x + 3, y : y + 3].tolist()
+        codes = self.codes
+        return (
+            codes[a0]
+            | codes[a1] << 1
+            | codes[a2] << 2
+            | codes[a3] << 3
+            | codes[a4] << 4
+            | codes[a5] << 5
+            | codes[a6] << 6
+            | codes[a7] << 7
+            | codes[a8] << 8
+        )
 
     # Draw the cell on the screen
     def draw(self, screen, cell_size) -> None:
@@ -68,284 +359,326 @@ class Cell:
             ),
         )
 
-    # Makes sure that the grid is synced and that there are no ghost cells
-    def fix(self, grid):
-        if (
-            self.position[0] < 0
-            or self.position[0] >= len(grid)
-            or self.position[1] < 0
-            or self.position[1] >= len(grid[0])
-        ):
-            return
-        if grid[self.position[0], self.position[1]] != self.cell_layer:
-            grid[self.position[0], self.position[1]] = self.cell_layer
+    # Whether the cell could be placed at its position (in bounds and free)
+    def fits(self, grid) -> bool:
+        x, y = self.position
+        if x < 0 or y < 0 or x >= grid.shape[0] or y >= grid.shape[1]:
+            return False
+        if self.cell_layer == EMPTY_LAYER:
+            return marker_at(x, y) is None
+        return grid[x, y] == EMPTY_LAYER
+
+    # Adds the cell to the simulation at its position, which has to be free
+    def place(self, grid, cell_dict) -> None:
+        x, y = self.position
+        cell_list = cell_dict[self.cell_type]
+        self.index = len(cell_list)
+        cell_list.append(self)
+        if self.cell_layer == EMPTY_LAYER:
+            markers[(x, y)] = self
+        else:
+            owners[x, y] = self.slot + 1
+            grid[x, y] = self.cell_layer
+            if self.material.durability:
+                health[x, y] = self.material.durability
+        chunks.wake(x, y)
+        _touch(x, y)
+
+    # Places the cell if it fits, otherwise throws it away
+    def try_place(self, grid, cell_dict) -> bool:
+        if self.fits(grid):
+            self.place(grid, cell_dict)
+            return True
+        self.discard()
+        return False
+
+    # Frees the cell's storage without it ever having been placed
+    def discard(self) -> None:
+        store.remove(self.slot)
+        self.slot = -1
+        if self.pool is not None:
+            self.pool.give(self)
 
     def remove(self, grid, cell_dict):
-        grid[self.position[0], self.position[1]] = 0
-        cell_dict[self.cell_type].remove(self)
+        x, y = self.position
+        # Fill the gap in the cell list with the last cell, instead of shifting
+        cell_list = cell_dict[self.cell_type]
+        last = cell_list.pop()
+        if last is not self:
+            index = self.index
+            cell_list[index] = last
+            last.index = index
+        if self.cell_layer == EMPTY_LAYER:
+            del markers[(x, y)]
+        else:
+            owners[x, y] = 0
+            grid[x, y] = EMPTY_LAYER
+            if self.material.durability:
+                health[x, y] = 0
+        chunks.wake(x, y)
+        _touch(x, y)
+        slot = self.slot
+        store.remove(slot)
+        self.slot = -1
+        # The last cell was moved into the freed slot
+        if slot < store.count:
+            moved = store.views[slot]
+            if moved.cell_layer != EMPTY_LAYER and self._placed(moved):
+                owners[moved.position] = slot + 1
+        if self.pool is not None:
+            self.pool.give(self)
 
+    # Whether the cell owns its position (cells that were made but not placed don't)
+    @staticmethod
+    def _placed(cell: "Cell") -> bool:
+        x, y = cell.position
+        return (
+            0 <= x < owners.shape[0]
+            and 0 <= y < owners.shape[1]
+            and owners.item(x, y) == store.count + 1
+        )
 
-# Burnable Solid Cell
+
+# Burnable Solid Cell (burns and is eaten by acid through its durability)
 # Layer: 1
 class BurnSolid(Cell):
-    def __init__(self, position=(0, 0)):
-        super().__init__("wood", position)
-
-        self.color = (130, 70, 52)
-        self.burn_damage = 25
+    __slots__ = ()
+    cell_type = "wood"
 
 
 # Standard Solid Cell
 # Layer: 1
 class Solid(Cell):
-    def __init__(self, position=(0, 0)):
-        super().__init__("solid", position)
+    __slots__ = ()
+    cell_type = "solid"
 
-        self.color = (255, 255, 255)
+
+# Time Slow Cell (slows down time in the chunks around it)
+# Layer: 1
+class TimeSlow(Solid):
+    __slots__ = ()
+    cell_type = "time slow"
+    reach = 32  # Cells out from it that are slowed down
+    dilation = 10  # Ticks the chunks it slows down take for one
 
 
 # Sand Cell
 # Layer: 2
 class Sand(Cell):
+    __slots__ = ()
+    cell_type = "sand"
+    friction = 0.1
+    draws = ("uniform", "again", "coin")
+
     def __init__(self, position=(0, 0)):
-        super().__init__(
-            "sand",
-            position,
-            SAND_LAYER,
-            [EMPTY_LAYER, SMOKE_LAYER, FIRE_LAYER, WATER_LAYER],
-        )
+        super().__init__(position)
 
-        self.color = (194, 178, 128)
-        self.friction = 0.1
         self.chance = 1
 
-    def update(self, grid, cell_dict):
-        neighbors = self.neighbors(grid)
+    def update(self, grid, cell_dict, neighbors=None):
+        code = self.neighbors(grid, neighbors)
+        turn = randoms.turn
 
         # Reset chance to fall to the side if there is something above
-        if neighbors[1] != EMPTY_LAYER:
-            self.chance = random.random()
+        if not code & UP << EMPTY_SHIFT:
+            self.chance = randoms.uniform.item(turn)
 
         # Fall if able to (Ignore water)
-        if neighbors[6] in self.ignore_layers:
+        if code & DOWN:
             self.move(grid, 0, 1)
 
         # Fall to the side
         elif self.chance > self.friction:
             if (
-                random.choice([0, 1])
-                and neighbors[5] in self.ignore_layers
-                and neighbors[3] in self.ignore_layers
+                randoms.coin.item(turn)
+                and code & DOWN_LEFT
+                and code & LEFT
             ):
                 self.move(grid, -1, 1)
-                self.chance = random.random()
-            elif (
-                neighbors[7] in self.ignore_layers
-                and neighbors[4] in self.ignore_layers
-            ):
+                self.chance = randoms.again.item(turn)
+            elif code & DOWN_RIGHT and code & RIGHT:
                 self.move(grid, 1, 1)
-                self.chance = random.random()
+                self.chance = randoms.again.item(turn)
+
+
+# Water and acid
+# When they can't fall they flow along their row to the closest place they can
+# fall from, up to spread cells away in one tick. With nowhere lower to go
+# they stay put, so a level pool settles and goes to sleep
+class Liquid(Cell):
+    __slots__ = ()
+    spread = 32  # How far it can flow sideways in one tick
+    draws = ("coin",)
+
+    # Flows to the closest drop, trying its direction first
+    # (direction 1 = left, 0 = right)
+    def flow(self, grid, code: int) -> None:
+        open_sides = {-1: code & LEFT, 1: code & RIGHT}
+        x, y = self.position
+        for side in (-1, 1) if self.direction else (1, -1):
+            if not open_sides[side]:
+                continue
+            distance = self._drop(x, y, side)
+            if distance:
+                self.move(grid, side * distance, 0)
+                self.direction = int(side < 0)
+                return
+
+    # Gets how far along the row to the side the first free cell with a free
+    # cell below it is, 0 if there isn't one before something blocks the way
+    def _drop(self, x: int, y: int, side: int) -> int:
+        free = MOVES[self.cell_layer]
+        # In padded coordinates the cell is at (x + 1, y + 1)
+        if side > 0:
+            xs = slice(x + 2, x + 2 + self.spread)
+        else:
+            xs = slice(max(0, x + 1 - self.spread), x + 1)
+        row = free[padded[xs, y + 1]]
+        below = free[padded[xs, y + 2]]
+        if side < 0:
+            row, below = row[::-1], below[::-1]
+        run = len(row) if row.all() else int(row.argmin())
+        drops = np.flatnonzero(below[:run])
+        return int(drops[0]) + 1 if len(drops) else 0
 
 
 # Water Cell
 # Layer: 3
-class Water(Cell):
+class Water(Liquid):
+    __slots__ = ()
+    cell_type = "water"
+    shading = True  # Whether it darkens with depth as it moves
+
     def __init__(self, position=(0, 0)):
-        super().__init__(
-            "water", position, WATER_LAYER, [EMPTY_LAYER, FIRE_LAYER, SMOKE_LAYER]
-        )
+        super().__init__(position)
 
-        self.color = (0, 100, 255)
-        self.direction = random.choice([0, 1])
+        self.direction = randoms.side()
 
     # Updates the cell
-    def update(self, grid, cell_dict):
-        neighbors = self.neighbors(grid)
+    def update(self, grid, cell_dict, neighbors=None):
+        code = self.neighbors(grid, neighbors)
 
-        # Move up if there is sand where there is water
-        if neighbors[8] == SAND_LAYER:
-            self.move(grid, 0, -1, SAND_LAYER)
         # Move down if possible, update random moving direction
-        elif neighbors[6] in self.ignore_layers:
+        if code & DOWN:
             self.move(grid, 0, 1)
-            self.direction = random.choice([0, 1])
+            self.direction = randoms.coin.item(randoms.turn)
         else:
             # Fall to the sides
             if (
-                random.choice([0, 1])
-                and neighbors[5] in self.ignore_layers
-                and neighbors[3] in self.ignore_layers
+                randoms.coin.item(randoms.turn)
+                and code & DOWN_LEFT
+                and code & LEFT
             ):
                 self.move(grid, -1, 1)
-            elif neighbors[7] in self.ignore_layers and neighbors[4] in [
-                EMPTY_LAYER,
-                FIRE_LAYER,
-            ]:
+            elif code & DOWN_RIGHT and code & RIGHT:
                 self.move(grid, 1, 1)
             else:
-                # If the direction is right and is available to move to, move to the right
-                if self.direction and neighbors[3] in self.ignore_layers:
-                    self.move(grid, -1, 0)
-                # Check if you can move to the left and direction is left
-                elif neighbors[4] in self.ignore_layers:
-                    self.move(grid, 1, 0)
-                    # self.direction = 0 if self.direction == 1 else 1
-                # Recheck right and move
-                elif neighbors[3] in self.ignore_layers:
-                    self.move(grid, -1, 0)
-                    self.direction = 0 if self.direction == 1 else 1
-                # Flip direction
-                else:
-                    self.direction = 0 if self.direction == 1 else 1
-
-        self.color = (
-            0,
-            max(20, 100 - self.position[1]),
-            max(185, 255 - self.position[1]),
-        )
+                self.flow(grid, code)
+
+        if self.shading:
+            self.color = (
+                0,
+                max(20, 100 - self.position[1]),
+                max(185, 255 - self.position[1]),
+            )
+
 
+class Acid(Liquid):
+    __slots__ = ()
+    cell_type = "acid"
 
-class Acid(Cell):
     def __init__(self, position=(0, 0)):
-        super().__init__(
-            "acid", position, WATER_LAYER, [EMPTY_LAYER, SMOKE_LAYER, FIRE_LAYER]
-        )
-        self.color = (0, 120, 120)
-        self.direction = random.choice([0, 1])
-        self.slowness = 2
-        self.frame = 0
+        super().__init__(position)
+        self.direction = randoms.side()
 
     # Updates the cell
-    def update(self, grid, cell_dict):
-        neighbors = self.neighbors(grid)
+    def update(self, grid, cell_dict, neighbors=None):
+        code = self.neighbors(grid, neighbors)
 
-        # Move up if there is sand where there is water
-        if neighbors[8] == SAND_LAYER:
-            self.move(grid, 0, -1, SAND_LAYER)
         # Move down if possible, update random moving direction
-        if self.frame < self.slowness:
-            self.frame += 1
-
+        if code & DOWN:
+            self.move(grid, 0, 1)
+            self.direction = randoms.coin.item(randoms.turn)
         else:
-            self.frame = 0
-            if neighbors[6] in self.ignore_layers:
-                self.move(grid, 0, 1)
-                self.direction = random.choice([0, 1])
+            # Fall to the sides
+            if (
+                randoms.coin.item(randoms.turn)
+                and code & DOWN_LEFT
+                and code & LEFT
+            ):
+                self.move(grid, -1, 1)
+            elif code & DOWN_RIGHT and code & RIGHT:
+                self.move(grid, 1, 1)
             else:
-                # Fall to the sides
-                if (
-                    random.choice([0, 1])
-                    and neighbors[5] in self.ignore_layers
-                    and neighbors[3] in self.ignore_layers
-                ):
-                    self.move(grid, -1, 1)
-                elif neighbors[7] in self.ignore_layers and neighbors[4] in [
-                    EMPTY_LAYER,
-                    FIRE_LAYER,
-                ]:
-                    self.move(grid, 1, 1)
-                else:
-                    # If the direction is right and is available to move to, move to the right
-                    if self.direction and neighbors[3] in self.ignore_layers:
-                        self.move(grid, -1, 0)
-                    # Check if you can move to the left and direction is left
-                    elif neighbors[4] in self.ignore_layers:
-                        self.move(grid, 1, 0)
-                        # self.direction = 0 if self.direction == 1 else 1
-                    # Recheck right and move
-                    elif neighbors[3] in self.ignore_layers:
-                        self.move(grid, -1, 0)
-                        self.direction = 0 if self.direction == 1 else 1
-                    # Flip direction
-                    else:
-                        self.direction = 0 if self.direction == 1 else 1
-
-        if (
-            neighbors[6] == SOLID_LAYER
-            or neighbors[4] == SOLID_LAYER
-            or neighbors[3] == SOLID_LAYER
-        ):
-            for cell in cell_dict["wood"]:
-                # Get the solid cell
-                if (
-                    cell.position == (self.position[0], self.position[1] + 1)
-                    or cell.position == (self.position[0] + 1, self.position[1])
-                    or cell.position == (self.position[0] - 1, self.position[1])
-                ):
-                    if cell.burn_damage < 0:
-                        cell.remove(grid, cell_dict)
-                        cell_dict["smoke"].append(
-                            Smoke((cell.position[0], cell.position[1]))
-                        )
-                    else:
-                        cell.burn_damage -= 1
+                self.flow(grid, code)
 
 
 class Smoke(Cell):
+    __slots__ = ()
+    cell_type = "smoke"
+    pool = CellPool()
+    draws = ("normal", "coin")
+    aging = 1  # Lifetime lost each tick
+
     def __init__(self, position=(0, 0)):
-        super().__init__(
-            "smoke", position, SMOKE_LAYER, [EMPTY_LAYER, FIRE_LAYER, WATER_LAYER]
-        )
+        super().__init__(position)
 
-        self.variation = random.randrange(10, 100)
+        self.variation = randoms.randrange(10, 100)
         self.color = (170 - self.variation, 170 - self.variation, 170 - self.variation)
-        self.direction = random.choice([0, 1])
-        self.lifetime = 100
+        self.direction = randoms.side()
 
-    def update(self, grid, cell_dict):
-        neighbors = self.neighbors(grid)
+    def update(self, grid, cell_dict, neighbors=None):
+        code = self.neighbors(grid, neighbors)
+        # Changes every tick even when it doesn't move
+        chunks.wake(*self.position)
 
-        self.lifetime -= 1
+        self.lifetime -= self.aging
 
         # Move smoke upwards and less to the sides
-        normal = random.normalvariate(5, 10)  # normal distrubution
+        turn = randoms.turn
+        normal = 5 + 10 * randoms.normal.item(turn)  # normal distrubution
         # if neighbors[8] == WATER_LAYER:
         #     self.remove(grid, cell_dict)
         #     return
 
         # Die if out of bounds or it's lifetime is done
-        if (
-            neighbors[0] == -1
-            or neighbors[1] == -1
-            or neighbors[2] == -1
-            or self.lifetime <= 0
-        ):
+        if code >> OUTSIDE_SHIFT & (UP_LEFT | UP | UP_RIGHT) or self.lifetime <= 0:
             self.remove(grid, cell_dict)
             return
 
         # Move up and to the left
         if (
             normal < 2
-            and neighbors[0] in self.ignore_layers
-            and neighbors[3] in self.ignore_layers
+            and code & UP_LEFT
+            and code & LEFT
         ):
             self.move(grid, -1, -1)
         # Move up and to the right
         elif (
             normal > 8
-            and neighbors[1] in self.ignore_layers
-            and neighbors[4] in self.ignore_layers
+            and code & UP_RIGHT
+            and code & RIGHT
         ):
             self.move(grid, 1, -1)
         # Move up
-        elif neighbors[1] in self.ignore_layers:
+        elif code & UP:
             self.move(grid, 0, -1)
         # Move to the left or right depending on direction
         elif (
             self.direction
-            and neighbors[1] not in self.ignore_layers
-            and neighbors[3] in self.ignore_layers
+            and not code & UP
+            and code & LEFT
         ):
             self.move(grid, -1, 0)
         # Move to the right
         elif (
-            neighbors[1] not in self.ignore_layers
-            and neighbors[4] in self.ignore_layers
+            not code & UP
+            and code & RIGHT
         ):
             self.move(grid, 1, 0)
         # Reset direction
         else:
-            self.direction = random.choice([0, 1])
+            self.direction = randoms.coin.item(turn)
 
         # Dim color over time
         color = max(0, int(((170 - self.variation) / 100) * self.lifetime))
@@ -355,114 +688,420 @@ class Smoke(Cell):
 # Fire Cell
 # Layer: 4
 class Fire(Cell):
-    def __init__(self, position=(0, 0), lifetime=10):
-        super().__init__("fire", position, FIRE_LAYER, [EMPTY_LAYER, SMOKE_LAYER])
+    __slots__ = ()
+    cell_type = "fire"
+    pool = CellPool()
+    draws = ("normal", "uniform", "coin")
+    aging = 1  # Lifetime lost each tick
+
+    # Lifetime None is the material's
+    def __init__(self, position=(0, 0), lifetime=None):
+        super().__init__(position)
 
-        variation = random.randrange(10, 100)
+        variation = randoms.randrange(10, 100)
         self.color = (255 - variation, 120 - variation, 0)
-        self.direction = random.choice([0, 1])
-        self.lifetime = lifetime
+        self.direction = randoms.side()
+        if lifetime is not None:
+            self.lifetime = lifetime
         self.cling_factor = 0
 
+    # Water moving onto the fire puts it out
+    def displaced(self, other):
+        if other.cell_layer == WATER_LAYER:
+            self.lifetime = 0
+
     # Update Cell
-    def update(self, grid, cell_dict):
-        neighbors = self.neighbors(grid)
+    def update(self, grid, cell_dict, neighbors=None):
+        code = self.neighbors(grid, neighbors)
+        # Changes every tick even when it doesn't move
+        chunks.wake(*self.position)
 
-        self.lifetime -= 1
+        self.lifetime -= self.aging
 
         # Move fire upwards and less to the sides
-        normal = random.normalvariate(5, 10)
-        if neighbors[8] == WATER_LAYER:
-            self.remove(grid, cell_dict)
-            return
+        turn = randoms.turn
+        normal = 5 + 10 * randoms.normal.item(turn)
 
-        if (
-            neighbors[0] == -1
-            or neighbors[1] == -1
-            or neighbors[2] == -1
-            or self.lifetime <= 0
-        ):
+        if code >> OUTSIDE_SHIFT & (UP_LEFT | UP | UP_RIGHT) or self.lifetime <= 0:
             self.remove(grid, cell_dict)
             return
 
-        # Burn the solids
-        if SOLID_LAYER in neighbors:
-            # Loop through neighboring
-            for y in range(-1, 2):
-                for x in range(-1, 2):
-                    for cell in cell_dict["wood"]:
-                        # Get the solid cell
-                        if cell.position == (
-                            self.position[0] + x,
-                            self.position[1] + y,
-                        ):
-                            # Kill the solid and spread the fire + smoke(3)
-                            if cell.burn_damage < 0:
-                                cell.remove(grid, cell_dict)
-                                self.lifetime += 20
-                                grid[cell.position[0]][cell.position[1]] = 2
-                                cell_dict["fire"].append(
-                                    Fire((cell.position[0], cell.position[1]), 30)
-                                )
-                                cell_dict["smoke"].append(
-                                    Smoke((cell.position[0], cell.position[1] - 1))
-                                )
-                                cell_dict["smoke"].append(
-                                    Smoke((cell.position[0], cell.position[1] - 1))
-                                )
-                                cell_dict["smoke"].append(
-                                    Smoke((cell.position[0], cell.position[1] - 1))
-                                )
-                                self.cling_factor = 0
-                            else:
-                                cell.burn_damage -= 1
-                                self.lifetime += 1
-                                if (x, y) in [(-1, 0), (1, 0), (0, 1), (-1, 0)]:
-                                    self.cling_factor = 1
-        else:
-            self.cling_factor = 0
-        if random.random() < self.cling_factor:
+        # Burning the wood around it is done for every fire at once by the
+        # combustion module, which also sets the cling factor
+        if randoms.uniform.item(turn) < self.cling_factor:
             pass
         elif (
             normal < 2
-            and neighbors[0] in self.ignore_layers
-            and neighbors[3] in self.ignore_layers
+            and code & UP_LEFT
+            and code & LEFT
         ):
             self.move(grid, -1, -1)
         elif (
             normal > 8
-            and neighbors[1] in self.ignore_layers
-            and neighbors[4] in self.ignore_layers
+            and code & UP_RIGHT
+            and code & RIGHT
         ):
             self.move(grid, 1, -1)
-        elif neighbors[1] in self.ignore_layers:
+        elif code & UP:
             self.move(grid, 0, -1)
         elif (
             self.direction
-            and neighbors[1] == FIRE_LAYER
-            and neighbors[3] in self.ignore_layers
+            and code & UP << SAME_SHIFT
+            and code & LEFT
         ):
             self.move(grid, -1, 0)
-        elif neighbors[1] in self.ignore_layers and neighbors[4] in self.ignore_layers:
+        elif code & UP and code & RIGHT:
             self.move(grid, 1, 0)
         else:
-            self.direction = random.choice([0, 1])
+            self.direction = randoms.coin.item(turn)
 
 
 # Destroy Cell
 # Layer: 0
 class Destroy(Cell):
-    def __init__(self, position=(0, 0)):
-        super().__init__("destroy", position, EMPTY_LAYER)
-
-        self.color = (150, 0, 0)
+    __slots__ = ()
+    cell_type = "destroy"
 
-    def update(self, grid, cell_dict):
+    def update(self, grid, cell_dict, neighbors=None):
 
         if grid[self.position[0], self.position[1]] != EMPTY_LAYER:
-            for celltype in cell_dict:  # for each cell type
-                if celltype == "destroy" or celltype == "solid":
-                    continue
-                for cell in cell_dict[celltype]:  # for each cell in the list
-                    if cell.position == self.position:
-                        cell.remove(grid, cell_dict)
+            cell = cell_at(*self.position)
+            if cell is not None and cell.cell_type not in ("destroy", "solid"):
+                cell.remove(grid, cell_dict)
+
+
+# Updates the cells in the slots one by one with their class's update rule
+# (the batch hook of the materials whose rules are written per cell)
+# Returns the number of cells updated
+def update_each(grid, cell_dict, slots) -> int:
+    views = store.views
+    group = [views[slot] for slot in slots.tolist()]
+    randoms.deal(len(group), group[0].draws)
+    updates = 0
+    codes = gather_neighbors(slots, group[0].cell_layer)
+    for turn, (cell, neighbors) in enumerate(zip(group, codes)):
+        randoms.turn = turn
+        # Skip cells that were removed earlier in this tick
+        if cell.alive:
+            cell.update(grid, cell_dict, neighbors)
+            updates += 1
+    return updates
+
+
+# Moves the cells in the slots by (dx, dy) all at once, swapping places with
+# whatever is at their new positions like move() does. The cells have to be
+# able to move there, and none of them can be in the way of another
+# Every group gathers its neighbors again before it's updated, so unlike
+# move() this doesn't need to mark them as changed
+# Returns the number of cells moved
+def move_many(slots, dx: int, dy: int, grid) -> int:
+    if len(slots) == 0:
+        return 0
+    xs, ys = store.x[slots], store.y[slots]
+    to_xs, to_ys = xs + dx, ys + dy
+    others = np.asarray(owners[to_xs, to_ys])
+    # Cells in the way take the old places...
+    owners[xs, ys] = others
+    grid[xs, ys] = EMPTY_LAYER
+    swapped = np.flatnonzero(others)
+    other_slots = others[swapped] - 1
+    store.x[other_slots] = xs[swapped]
+    store.y[other_slots] = ys[swapped]
+    grid[xs[swapped], ys[swapped]] = LAYERS[store.material[other_slots]]
+    # ...and so do engine particles
+    if particles is not None:
+        taken = (others == 0) & (particles.kind[to_xs, to_ys] != EMPTY_LAYER)
+        for x, y, to_x, to_y in zip(
+            xs[taken].tolist(), ys[taken].tolist(), to_xs[taken].tolist(), to_ys[taken].tolist()
+        ):
+            particles.displace(to_x, to_y, x, y)
+
+    store.x[slots] = to_xs
+    store.y[slots] = to_ys
+    owners[to_xs, to_ys] = slots + 1
+    grid[to_xs, to_ys] = LAYERS[store.material[slots]]
+    chunks.wake_many(xs, ys)
+    chunks.wake_many(to_xs, to_ys)
+    views = store.views
+    for slot, other in zip(slots[swapped].tolist(), other_slots.tolist()):
+        views[other].displaced(views[slot])
+    profiler.moves += len(slots)
+    return len(slots)
+
+
+# Batch hook of the materials that fall straight down through the layers they
+# displace: every cell with room below it moves down one at the same time
+def fall(grid, cell_dict, slots) -> int:
+    xs, ys = store.x[slots], store.y[slots]
+    layer = LAYERS[store.material.item(slots[0])]
+    # In padded coordinates the cell below is at (x + 1, y + 2)
+    below = np.asarray(padded[xs + 1, ys + 2])
+    move_many(slots[MOVES[layer][below]], 0, 1, grid)
+    return len(slots)
+
+
+# Registers the material and points its cell class at it, making a class from
+# the data if it doesn't have one (its cells are only views then, the batch
+# hook does all the work)
+def register_material(material: Material) -> Material:
+    cell_class = material.cell_class
+    if cell_class is None:
+        name = "".join(word.title() for word in material.name.split())
+        cell_class = type(name, (Cell,), {"__slots__": ()})
+        material.cell_class = cell_class
+    cell_class.cell_type = material.name
+    cell_class.material = material
+    cell_class.cell_layer = material.layer
+    return register(material)
+
+
+# The materials, in id order. The tables below are made from them
+for material in (
+    Material("solid", SOLID_LAYER, (255, 255, 255), cell_class=Solid),
+    Material("wood", SOLID_LAYER, (130, 70, 52), durability=25, cell_class=BurnSolid),
+    Material(
+        "sand",
+        SAND_LAYER,
+        (194, 178, 128),
+        displaces=[EMPTY_LAYER, SMOKE_LAYER, FIRE_LAYER, WATER_LAYER],
+        update=update_each,
+        rank=10,
+        particle=SAND_LAYER,
+        cell_class=Sand,
+    ),
+    Material(
+        "water",
+        WATER_LAYER,
+        (0, 100, 255),
+        displaces=[EMPTY_LAYER, FIRE_LAYER, SMOKE_LAYER],
+        update=update_each,
+        rank=20,
+        particle=WATER_LAYER,
+        cell_class=Water,
+    ),
+    # Thicker than water, it only moves every third tick
+    Material(
+        "acid",
+        WATER_LAYER,
+        (0, 120, 120),
+        displaces=[EMPTY_LAYER, SMOKE_LAYER, FIRE_LAYER],
+        update=update_each,
+        rank=30,
+        period=3,
+        cell_class=Acid,
+    ),
+    Material(
+        "smoke",
+        SMOKE_LAYER,
+        (120, 120, 120),
+        displaces=[EMPTY_LAYER, FIRE_LAYER, WATER_LAYER],
+        lifetime=100,
+        update=update_each,
+        rank=50,
+        cell_class=Smoke,
+    ),
+    Material(
+        "fire",
+        FIRE_LAYER,
+        (230, 100, 0),
+        displaces=[EMPTY_LAYER, SMOKE_LAYER],
+        lifetime=10,
+        update=update_each,
+        rank=40,
+        cell_class=Fire,
+    ),
+    Material(
+        "destroy",
+        EMPTY_LAYER,
+        (150, 0, 0),
+        displaces=[EMPTY_LAYER],
+        update=update_each,
+        rank=60,
+        cell_class=Destroy,
+    ),
+    Material("time slow", SOLID_LAYER, (255, 0, 255), cell_class=TimeSlow),
+    # Like clay but really soft, it sinks through water
+    Material(
+        "mud",
+        SAND_LAYER,
+        (95, 65, 40),
+        displaces=[EMPTY_LAYER, SMOKE_LAYER, FIRE_LAYER, WATER_LAYER],
+        variation=15,
+        update=fall,
+        rank=15,
+    ),
+):
+    register_material(material)
+
+
+# Material ids used by the cell store
+MATERIALS = list(REGISTRY)
+
+# Cell class for each material
+CELL_CLASSES = {name: material.cell_class for name, material in REGISTRY.items()}
+
+
+# Pools of the cell types that have them
+POOLS = [
+    cell_class.pool for cell_class in CELL_CLASSES.values() if cell_class.pool is not None
+]
+
+
+# Makes the objects of cells removed since the last call reusable (once per tick)
+def collect_pools() -> None:
+    for pool in POOLS:
+        pool.collect()
+
+
+# Gets the live, pooled and peak counts of each pooled cell type
+def pool_stats() -> dict:
+    return {
+        cell_class.cell_type: cell_class.pool.stats()
+        for cell_class in CELL_CLASSES.values()
+        if cell_class.pool is not None
+    }
+
+
+# Which layers each layer can move into (by swapping places with what's there),
+# as MOVES[mover layer, target layer]. Built from the layers the materials
+# displace, materials on the same layer move the same way. The extra last
+# column stands for outside the grid (OUTSIDE is -1), which is never free
+MOVES = np.zeros((LAYER_COUNT, LAYER_COUNT + 1), dtype=bool)
+for material in REGISTRY.values():
+    MOVES[material.layer, material.displaces] = True
+for cell_class in CELL_CLASSES.values():
+    # Plain tuples index faster than NumPy arrays one item at a time
+    cell_class.codes = tuple(
+        MOVES.item(cell_class.cell_layer, around)
+        | (around == OUTSIDE) << OUTSIDE_SHIFT
+        | (around == EMPTY_LAYER) << EMPTY_SHIFT
+        | (around == cell_class.cell_layer) << SAME_SHIFT
+        for around in [*range(LAYER_COUNT), OUTSIDE]
+    )
+
+
+# Layer and starting health of each material
+LAYERS = np.array([material.layer for material in REGISTRY.values()])
+DURABILITY = np.array([material.durability for material in REGISTRY.values()], dtype=np.int16)
+
+
+# Gets the slot order of each cell list and of the markers, so that load_cells
+# can put them back exactly (not just in slot order)
+def cell_order(cell_dict) -> dict:
+    order = {}
+    for celltype, cell_list in cell_dict.items():
+        order["list_" + celltype] = np.array([cell.slot for cell in cell_list], np.int32)
+    order["index_markers"] = np.array(
+        [(x, y, cell.slot) for (x, y), cell in markers.items()], np.int32
+    ).reshape(-1, 3)
+    return order
+
+
+# Sets the array (dense or sparse) back to all zeros
+def _clear(array) -> None:
+    if isinstance(array, ChunkedArray):
+        array.clear()
+    else:
+        array[:] = 0
+
+
+# Replaces every cell with the ones in the stored arrays (one per store field)
+# Only a bare view object is made per cell, the attributes are copied in bulk
+def load_cells(arrays: dict, cell_dict, order: Optional[dict] = None) -> None:
+    views = []
+    for slot, material in enumerate(arrays["material"].tolist()):
+        cell_class = CELL_CLASSES[MATERIALS[material]]
+        view = cell_class.__new__(cell_class)
+        view.slot = slot
+        views.append(view)
+    store.load(arrays, views)
+
+    # Every cell owns its position, so the owners come straight from the arrays
+    owning = np.flatnonzero(LAYERS[arrays["material"]] != EMPTY_LAYER)
+    _clear(owners)
+    owners[arrays["x"][owning], arrays["y"][owning]] = owning + 1
+    # Cells with durability start out whole, main puts the saved health back over this
+    durable = np.flatnonzero(DURABILITY[arrays["material"]])
+    _clear(health)
+    health[arrays["x"][durable], arrays["y"][durable]] = DURABILITY[arrays["material"][durable]]
+
+    markers.clear()
+    for celltype in cell_dict:
+        cell_dict[celltype].clear()
+    if order is None:
+        for view in views:
+            cell_dict[view.cell_type].append(view)
+            if view.cell_layer == EMPTY_LAYER:
+                markers[view.position] = view
+    else:
+        for celltype in cell_dict:
+            slots = order["list_" + celltype].tolist()
+            cell_dict[celltype].extend(views[slot] for slot in slots)
+        for x, y, slot in order["index_markers"].tolist():
+            markers[(x, y)] = views[slot]
+    for cell_list in cell_dict.values():
+        slots = np.array([cell.slot for cell in cell_list], dtype=np.int32)
+        store.index[slots] = np.arange(len(slots))
+    chunks.wake_all()
+
+
+# Gets the positions in the arrays that are in the grid, each once (in the
+# order they first come in)
+def unique_positions(xs, ys, shape):
+    xs, ys = np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp)
+    inside = (xs >= 0) & (ys >= 0) & (xs < shape[0]) & (ys < shape[1])
+    xs, ys = xs[inside], ys[inside]
+    _, first = np.unique(xs * shape[1] + ys, return_index=True)
+    first.sort()
+    return xs[first], ys[first]
+
+
+# Places a new cell of the class at every free position in the arrays (in
+# bounds, nothing there yet), all at once: the cells are made one by one, but
+# the grid, owners, cell list and chunks are written in bulk
+# Returns the number of cells placed
+def place_many(cell_class, xs, ys, grid, cell_dict) -> int:
+    xs, ys = unique_positions(xs, ys, grid.shape)
+    if cell_class.cell_layer == EMPTY_LAYER:
+        taken = [position in markers for position in zip(xs.tolist(), ys.tolist())]
+        free = ~np.array(taken, dtype=bool)
+    else:
+        free = np.asarray(grid[xs, ys]) == EMPTY_LAYER
+    xs, ys = xs[free], ys[free]
+    if len(xs) == 0:
+        return 0
+
+    views = [cell_class((x, y)) for x, y in zip(xs.tolist(), ys.tolist())]
+    slots = np.fromiter((view.slot for view in views), dtype=np.intp, count=len(views))
+    cell_list = cell_dict[cell_class.cell_type]
+    store.index[slots] = np.arange(len(cell_list), len(cell_list) + len(views))
+    cell_list.extend(views)
+    if cell_class.cell_layer == EMPTY_LAYER:
+        markers.update(zip(zip(xs.tolist(), ys.tolist()), views))
+    else:
+        owners[xs, ys] = slots + 1
+        grid[xs, ys] = cell_class.cell_layer
+        if cell_class.material.durability:
+            health[xs, ys] = cell_class.material.durability
+    chunks.wake_many(xs, ys)
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        _touch(x, y)
+    return len(views)
+
+
+# Removes the cells (and markers) at the positions in the arrays, looking them
+# up with the owners all at once. Returns the number of cells removed
+def remove_many(xs, ys, grid, cell_dict) -> int:
+    xs, ys = unique_positions(xs, ys, grid.shape)
+    owned = np.asarray(owners[xs, ys])
+    found = [store.views[owner - 1] for owner in owned[owned > 0].tolist()]
+    if markers:
+        found += [
+            markers[position]
+            for position in zip(xs.tolist(), ys.tolist())
+            if position in markers
+        ]
+    # Removing moves other cells between slots, the views stay the same
+    for cell in found:
+        cell.remove(grid, cell_dict)
+    return len(found)
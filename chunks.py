@@ -0,0 +1,145 @@
+import numpy as np
+
+
+CHUNK_SIZE = 16
+NEIGHBORHOOD = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+# Splits the world into fixed size chunks that sleep once nothing in them changes
+# Anything that moves, is placed or is removed wakes its chunk for the next tick
+# (and the neighboring chunk when it is on a chunk border). Asleep chunks are
+# skipped by the simulation and the renderer
+# With a focus (the chunks on screen), chunks outside of it only run every
+# period ticks, or never with a period of 0. Until then they stay pending, so
+# they pick up where they left off. Chunks in a time dilation zone (slow) only
+# run every dilation ticks, the same way
+class ChunkMap:
+    def __init__(self, shape: tuple[int, int] = (0, 0), size: int = CHUNK_SIZE) -> None:
+        self.size = size
+        self.period = 1  # Ticks between runs of the chunks out of focus
+        self.ticks = 0
+        self.reset(shape)
+
+    def reset(self, shape: tuple[int, int]) -> None:
+        self.shape = shape
+        chunk_shape = (-(-shape[0] // self.size), -(-shape[1] // self.size))
+        self.awake = np.zeros(chunk_shape, dtype=bool)  # Awake this tick
+        self.pending = np.zeros(chunk_shape, dtype=bool)  # Awake next tick
+        # Changed since the renderer last painted them (start with everything)
+        self.dirty = np.ones(chunk_shape, dtype=bool)
+        self.focus = None  # Chunks that always run (None = all of them)
+        self.slow = None  # Chunks in a time dilation zone (None = none are)
+        self.dilation = 1  # Ticks between runs of the slow chunks
+        # Chunks that ran this tick, asleep or not (None = all of them)
+        self.running = None
+
+    # Starts a new tick, the chunks woken during the last one are now awake
+    def advance(self) -> None:
+        self.ticks += 1
+        running = None  # Chunks that run this tick (None = all of them)
+        if self.focus is not None and not (self.period and self.ticks % self.period == 0):
+            running = self.focus
+        if self.slow is not None and self.ticks % self.dilation:
+            running = ~self.slow if running is None else running & ~self.slow
+        self.running = running
+        # Copied rather than swapped so the arrays can live in shared memory
+        if running is None:
+            self.awake[:] = self.pending
+            self.pending[:] = False
+        else:
+            np.logical_and(self.pending, running, out=self.awake)
+            self.pending &= ~running
+
+    # Slows down the chunks within reach cells of the positions in the arrays,
+    # so they only run every dilation ticks (none with empty arrays)
+    def dilate(self, xs, ys, reach: int, dilation: int) -> None:
+        if len(xs) == 0:
+            self.slow = None
+            return
+        size = self.size
+        slow = np.zeros_like(self.awake)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            slow[
+                max(0, (x - reach) // size) : (x + reach) // size + 1,
+                max(0, (y - reach) // size) : (y + reach) // size + 1,
+            ] = True
+        self.slow = slow
+        self.dilation = dilation
+
+    # Focuses on the chunks holding the (x, y) slices of cells and the chunks
+    # around them, the ones next to the area can reach into it
+    def watch(self, xs: slice, ys: slice) -> None:
+        size = self.size
+        focus = np.zeros_like(self.awake)
+        focus[
+            max(0, xs.start // size - 1) : -(-xs.stop // size) + 1,
+            max(0, ys.start // size - 1) : -(-ys.stop // size) + 1,
+        ] = True
+        self.focus = focus
+
+    # Wakes the chunk holding the position for the next tick
+    def wake(self, x: int, y: int) -> None:
+        if x < 0 or y < 0 or x >= self.shape[0] or y >= self.shape[1]:
+            return
+        size = self.size
+        cx, cy = x // size, y // size
+        # Cells on a border can affect the neighboring chunk too
+        x0 = cx - 1 if x % size == 0 and cx > 0 else cx
+        x1 = cx + 2 if x % size == size - 1 else cx + 1
+        y0 = cy - 1 if y % size == 0 and cy > 0 else cy
+        y1 = cy + 2 if y % size == size - 1 else cy + 1
+        self.pending[x0:x1, y0:y1] = True
+        self.dirty[x0:x1, y0:y1] = True
+
+    # Wakes the chunks holding every position in the arrays
+    def wake_many(self, xs, ys) -> None:
+        inside = (xs >= 0) & (ys >= 0) & (xs < self.shape[0]) & (ys < self.shape[1])
+        xs, ys = xs[inside], ys[inside]
+        size = self.size
+        for dx, dy in NEIGHBORHOOD:
+            # Step over the border only for cells that are on it
+            cx = (np.clip(xs + dx, 0, self.shape[0] - 1)) // size
+            cy = (np.clip(ys + dy, 0, self.shape[1] - 1)) // size
+            self.pending[cx, cy] = True
+            self.dirty[cx, cy] = True
+
+    # Wakes every chunk, e.g. after the grid was changed from outside
+    def wake_all(self) -> None:
+        self.pending[:] = True
+        self.dirty[:] = True
+
+    # Gets whether each position is in an awake chunk (or one set in the mask)
+    def is_awake(self, xs, ys, mask=None):
+        if mask is None:
+            mask = self.awake
+        inside = (xs >= 0) & (ys >= 0) & (xs < self.shape[0]) & (ys < self.shape[1])
+        awake = np.ones(len(xs), dtype=bool)  # Cells out of bounds are left alone
+        awake[inside] = mask[xs[inside] // self.size, ys[inside] // self.size]
+        return awake
+
+    # Expands a chunk mask to one value per cell (only inside the window if given)
+    def cell_mask(self, chunk_mask, window=None):
+        size = self.size
+        if window is None:
+            window = (slice(0, self.shape[0]), slice(0, self.shape[1]))
+        xs, ys = window
+        cx, cy = xs.start // size, ys.start // size
+        part = chunk_mask[cx : -(-xs.stop // size), cy : -(-ys.stop // size)]
+        full = np.repeat(np.repeat(part, size, axis=0), size, axis=1)
+        return full[
+            xs.start - cx * size : xs.stop - cx * size,
+            ys.start - cy * size : ys.stop - cy * size,
+        ]
+
+    # Gets the (x, y) slices covering every awake chunk plus a one cell margin
+    def bounds(self):
+        cxs = np.flatnonzero(self.awake.any(axis=1))
+        cys = np.flatnonzero(self.awake.any(axis=0))
+        if len(cxs) == 0:
+            return None
+        size = self.size
+        x0 = max(0, cxs[0] * size - 1)
+        x1 = min(self.shape[0], (cxs[-1] + 1) * size + 1)
+        y0 = max(0, cys[0] * size - 1)
+        y1 = min(self.shape[1], (cys[-1] + 1) * size + 1)
+        return slice(x0, x1), slice(y0, y1)
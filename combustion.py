@@ -0,0 +1,114 @@
+import numpy as np
+from cell import *
+import cell, heat
+
+
+FIRE = MATERIALS.index("fire")
+ACID = MATERIALS.index("acid")
+
+# Offsets of the 8 cells around a cell
+AROUND = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+# Acid eats the wood below it and to its sides, so wood is eaten by the acid
+# above it and to its sides
+EATEN_FROM = [(0, -1), (-1, 0), (1, 0)]
+# Fire clings to wood to its sides and below it
+CLING_TO = [(-1, 0), (1, 0), (0, 1)]
+
+BURNT_FIRE_LIFETIME = 30  # Lifetime of the fire that replaces burnt wood
+BURN_BONUS = 20  # Lifetime a fire gets for burning down a piece of wood
+
+
+# Sums the padded array shifted by each offset, over the unpadded area
+def _count(padded, offsets):
+    width, height = padded.shape[0] - 2, padded.shape[1] - 2
+    total = np.zeros((width, height), dtype=np.int16)
+    for dx, dy in offsets:
+        total += padded[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+    return total
+
+
+# Marks the positions in a zeroed array with a one cell border
+def _marks(shape, xs, ys):
+    marks = np.zeros((shape[0] + 2, shape[1] + 2), dtype=np.int16)
+    np.add.at(marks, (xs + 1, ys + 1), 1)
+    return marks
+
+
+# Burns and dissolves wood for one tick
+# Wood at IGNITION_TEMPERATURE or hotter (see heat.py) loses a health for each
+# time over it is, and every acid above or beside a piece of wood takes one
+# health off it (a shifted array sum over the area around the acid). Wood that
+# runs out turns into fire and smoke (or just smoke when only acid got it).
+# Fires get lifetime for the wood they burn and cling to wood next to them
+# Returns the number of wood cells that were used up
+def step(grid, cell_dict) -> int:
+    count = store.count
+    material = store.material[:count]
+    xs, ys = store.x[:count], store.y[:count]
+    fires = material == FIRE
+    acids = material == ACID
+    # Off screen and slowed down fire and acid wait for their chunks to run
+    # (asleep or not, settled acid still eats)
+    if chunks.running is not None:
+        ran = chunks.is_awake(xs, ys, chunks.running)
+        fires &= ran
+        acids &= ran
+    fires = np.flatnonzero(fires)
+    acids = np.flatnonzero(acids)
+    if len(fires) == 0 and len(acids) == 0 and heat.hot is None:
+        return 0
+
+    # Only the area around the fire and acid and the hot area can change
+    active = np.concatenate((fires, acids))
+    boxes = [] if heat.hot is None else [heat.hot]
+    if len(active):
+        boxes.append(
+            (
+                int(xs[active].min()) - 1,
+                int(xs[active].max()) + 2,
+                int(ys[active].min()) - 1,
+                int(ys[active].max()) + 2,
+            )
+        )
+    x0 = max(0, min(box[0] for box in boxes))
+    x1 = min(grid.shape[0], max(box[1] for box in boxes))
+    y0 = max(0, min(box[2] for box in boxes))
+    y1 = min(grid.shape[1], max(box[3] for box in boxes))
+    if x0 >= x1 or y0 >= y1:
+        return 0
+    shape = (x1 - x0, y1 - y0)
+    health = cell.health[x0:x1, y0:y1]  # A copy for sparse worlds, put back below
+
+    wood = health > 0
+    temperature = np.asarray(cell.temperature[x0:x1, y0:y1])
+    burning = (temperature // heat.IGNITION_TEMPERATURE).astype(np.int16) * wood
+    # Wood in chunks that don't run this tick doesn't burn either
+    if chunks.running is not None:
+        burning *= chunks.cell_mask(chunks.running, (slice(x0, x1), slice(y0, y1)))
+    eating = _count(_marks(shape, xs[acids] - x0, ys[acids] - y0), EATEN_FROM) * wood
+    health -= burning + eating
+    used_up = wood & (health <= 0)
+    cell.health[x0:x1, y0:y1] = health
+
+    if len(fires):
+        fx, fy = xs[fires] - x0 + 1, ys[fires] - y0 + 1
+        wood_marks = np.pad(wood, 1).astype(np.int16)
+        burnt_marks = np.pad(used_up & (burning > 0), 1).astype(np.int16)
+        damaged = sum(wood_marks[fx + dx, fy + dy] for dx, dy in AROUND)
+        burnt_down = sum(burnt_marks[fx + dx, fy + dy] for dx, dy in AROUND)
+        store.lifetime[fires] += damaged + (BURN_BONUS - 1) * burnt_down
+        touching = sum(wood_marks[fx + dx, fy + dy] for dx, dy in CLING_TO)
+        store.cling_factor[fires] = touching > 0
+
+    used_x, used_y = np.nonzero(used_up)
+    for x, y, burnt in zip(
+        (used_x + x0).tolist(), (used_y + y0).tolist(), burning[used_up].tolist()
+    ):
+        cell_at(x, y).remove(grid, cell_dict)
+        if burnt:
+            Fire((x, y), BURNT_FIRE_LIFETIME).place(grid, cell_dict)
+            for smoke_x in (x, x - 1, x + 1):
+                Smoke((smoke_x, y - 1)).try_place(grid, cell_dict)
+        else:
+            Smoke((x, y)).place(grid, cell_dict)
+    return len(used_x)
@@ -0,0 +1,249 @@
+from typing import Optional
+import pygame
+import numpy as np
+from cell import EMPTY_LAYER, SAND_LAYER, WATER_LAYER, MOVES
+from perf import profiler
+
+
+SAND_COLOR = (194, 178, 128)
+SAND_FRICTION = 0.1
+
+
+# Gets the slices for every source index that has an in bounds neighbor at the
+# offset, and the slices for those neighbors
+def _slices(size: int, offset: int):
+    start = max(0, -offset)
+    stop = size - max(0, offset)
+    return slice(start, stop), slice(start + offset, stop + offset)
+
+
+# Gets the (source, destination) views for a move by (dx, dy)
+def _pairs(shape, dx: int, dy: int):
+    xs, xd = _slices(shape[0], dx)
+    ys, yd = _slices(shape[1], dy)
+    return (xs, ys), (xd, yd)
+
+
+# Array based simulation of sand and water
+# Advances every sand and water cell in the grid at once with whole array
+# operations instead of one Cell.update call per particle
+# The seed can also be a NumPy Generator to draw from (main shares the cells' one)
+class ArrayEngine:
+    def __init__(
+        self, grid, seed=None, chunks=None, kind=None, direction=None
+    ) -> None:
+        self.grid = grid
+        self.chunks = chunks
+        # Layer of the particle owned by the engine at each position (0 = none)
+        if kind is None:
+            kind = np.zeros(grid.shape, dtype=np.int8)
+        self.kind = kind
+        # Water flow direction (1 = left, 0 = right), same meaning as Water.direction
+        if direction is None:
+            direction = np.zeros(grid.shape, dtype=np.int8)
+        self.direction = direction
+        self.rng = np.random.default_rng(seed)
+        # Water gets darker with depth, same as Water.update
+        depth = np.arange(grid.shape[1])
+        self.water_colors = np.stack(
+            (
+                np.zeros_like(depth),
+                np.maximum(20, 100 - depth),
+                np.maximum(185, 255 - depth),
+            ),
+            axis=1,
+        ).astype(np.uint8)
+
+    # Adds a particle of the layer at every empty position in the arrays
+    # (which have to be in the grid and each there once)
+    def spawn_many(self, xs, ys, layer: int) -> None:
+        free = self.grid[xs, ys] == EMPTY_LAYER
+        xs, ys = xs[free], ys[free]
+        self.kind[xs, ys] = layer
+        self.direction[xs, ys] = self.rng.integers(0, 2, len(xs))
+        self.grid[xs, ys] = layer
+        if self.chunks is not None:
+            self.chunks.wake_many(xs, ys)
+
+    # Removes the particles at the positions in the arrays
+    def erase_many(self, xs, ys) -> None:
+        taken = self.kind[xs, ys] != EMPTY_LAYER
+        xs, ys = xs[taken], ys[taken]
+        self.kind[xs, ys] = EMPTY_LAYER
+        self.grid[xs, ys] = EMPTY_LAYER
+        if self.chunks is not None:
+            self.chunks.wake_many(xs, ys)
+
+    # Removes the particle at the position, returns whether there was one
+    def erase(self, x: int, y: int) -> bool:
+        if self.kind[x, y] == EMPTY_LAYER:
+            return False
+        self.kind[x, y] = EMPTY_LAYER
+        self.grid[x, y] = EMPTY_LAYER
+        if self.chunks is not None:
+            self.chunks.wake(x, y)
+        return True
+
+    # Moves the particle at (x, y) to (to_x, to_y), when a cell swaps places with it
+    # The cell writes its own layer over (x, y)
+    def displace(self, x: int, y: int, to_x: int, to_y: int) -> None:
+        self.kind[to_x, to_y] = self.kind[x, y]
+        self.direction[to_x, to_y] = self.direction[x, y]
+        self.grid[to_x, to_y] = self.kind[x, y]
+        self.kind[x, y] = EMPTY_LAYER
+        if self.chunks is not None:
+            self.chunks.wake(x, y)
+            self.chunks.wake(to_x, to_y)
+
+    def count(self, layer: int) -> int:
+        return int(np.count_nonzero(self.kind == layer))
+
+    # Gets the engine's state that isn't in its arrays (for snapshots)
+    def state(self) -> dict:
+        return {"rng": self.rng.bit_generator.state}
+
+    def set_state(self, state: dict) -> None:
+        self.rng.bit_generator.state = state["rng"]
+
+    # Frees anything the engine holds on to
+    def close(self) -> None:
+        pass
+
+    # Swaps the masked source cells with the cells at the offset (dx, dy)
+    # Works on flat indices so the cost follows the number of moves, not the grid size
+    def _swap(self, done, src, mask, dx, dy) -> None:
+        index = np.flatnonzero(mask)
+        if len(index) == 0:
+            return
+        profiler.moves += len(index)
+        i, j = np.divmod(index, mask.shape[1])
+        xs = self._window[0].start + src[0].start + i
+        ys = self._window[1].start + src[1].start + j
+        height = self.grid.shape[1]
+        source = xs * height + ys
+        destination = source + dx * height + dy
+        for array in (self.kind, self.direction, done):
+            flat = array.reshape(-1)
+            flat[source], flat[destination] = flat[destination], flat[source]
+        # The grid is a view into its padded border array, so it can't be flattened
+        grid = self.grid
+        grid[xs, ys], grid[xs + dx, ys + dy] = grid[xs + dx, ys + dy], grid[xs, ys]
+        done.reshape(-1)[destination] = True
+        if self.chunks is not None:
+            self.chunks.wake_many(xs, ys)
+            self.chunks.wake_many(xs + dx, ys + dy)
+
+    # Gets the part of the array inside the window being simulated
+    def _view(self, array, where):
+        return array[self._window][where]
+
+    # Moves the particles of a layer that want to move by (dx, dy)
+    # Particles only move into cells that were free before the pass, so no two
+    # particles can claim the same cell. Sand may also swap places with water
+    def _move(self, layer, want, done, dx, dy, side=False) -> None:
+        src, dst = _pairs(want.shape, dx, dy)
+        mask = (self._view(self.kind, src) == layer) & ~self._view(done, src) & want[src]
+        mask &= self._free(layer, dst)
+        # Diagonal moves also need the cell to the side to be free
+        if side:
+            mask &= self._free(layer, (dst[0], src[1]))
+        self._swap(done, src, mask, dx, dy)
+
+    # Gets whether a particle of the layer can move into the cells
+    # Only empty cells and the engine's own particles (where the grid matches
+    # kind) can be swapped with, cells don't know about moves made here
+    def _free(self, layer, where):
+        kind = self._view(self.kind, where)
+        return MOVES[layer][kind] & (self._view(self.grid, where) == kind)
+
+    # Advances the simulation by one tick
+    # With chunks, only particles in awake chunks are simulated
+    # With a region (x0, x1), only particles in those columns are simulated and
+    # they can move at most one column out of it
+    # Returns the number of particles that were simulated
+    def step(self, region: Optional[tuple[int, int]] = None, done=None) -> int:
+        width, height = self.grid.shape
+        x0, x1 = region if region is not None else (0, width)
+        xs = slice(max(0, x0 - 1), min(width, x1 + 1))
+        ys = slice(0, height)
+        if self.chunks is not None:
+            bounds = self.chunks.bounds()
+            if bounds is None:
+                return 0
+            xs = slice(max(xs.start, bounds[0].start), min(xs.stop, bounds[0].stop))
+            ys = bounds[1]
+            if xs.start >= xs.stop:
+                return 0
+        self._window = (xs, ys)
+        grid, kind = self.grid[self._window], self.kind[self._window]
+        direction = self.direction[self._window]
+
+        owned = kind != EMPTY_LAYER
+
+        noise = self.rng.integers(0, 256, size=grid.shape, dtype=np.uint8)
+        coin = (noise & 1).astype(bool)
+        slide = noise >= int(256 * SAND_FRICTION)
+        anything = np.ones(grid.shape, dtype=bool)
+        if self.chunks is not None:
+            anything = self.chunks.cell_mask(self.chunks.awake, self._window)
+        # The margin around the region is only there to be moved into
+        anything[: max(0, x0 - xs.start)] = False
+        anything[max(0, x1 - xs.start) :] = False
+        coin &= anything
+        slide &= anything
+        if done is None:
+            done = np.zeros(self.grid.shape, dtype=bool)
+
+        # Fall down (sand sinks through water)
+        self._move(SAND_LAYER, anything, done, 0, 1)
+        self._move(WATER_LAYER, anything, done, 0, 1)
+        fell = done[self._window] & (kind == WATER_LAYER)
+        direction[fell] = (noise[fell] >> 1) & 1
+
+        # Fall to the sides, choosing a side at random first
+        for layer, want in ((SAND_LAYER, slide), (WATER_LAYER, anything)):
+            self._move(layer, want & coin, done, -1, 1, side=True)
+            self._move(layer, want, done, 1, 1, side=True)
+
+        # Flow sideways following the direction, flipping it at walls
+        water = (kind == WATER_LAYER) & ~done[self._window] & anything
+        free = MOVES[WATER_LAYER][kind] & (grid == kind)
+        left_free = np.zeros(grid.shape, dtype=bool)
+        right_free = np.zeros(grid.shape, dtype=bool)
+        left_free[1:] = free[:-1]
+        right_free[:-1] = free[1:]
+        to_left = direction.astype(bool) & left_free & anything
+        to_right = ~to_left & right_free & anything
+        turn = ~to_left & ~right_free
+        direction[water & turn] ^= 1
+        self._move(WATER_LAYER, to_left | (turn & left_free), done, -1, 0)
+        self._move(WATER_LAYER, to_right, done, 1, 0)
+        return int(np.count_nonzero(owned & anything))
+
+    # Writes the particle colors into an RGB array shaped like the grid, or like
+    # the (x, y) slices of the window when one is given
+    # Only the cells in the mask are painted when one is given
+    def paint(self, rgb, mask=None, window=None) -> None:
+        kind = self.kind if window is None else self.kind[window]
+        sand = kind == SAND_LAYER
+        water = kind == WATER_LAYER
+        if mask is not None:
+            sand &= mask
+            water &= mask
+        rgb[sand] = SAND_COLOR
+        xs, ys = np.nonzero(water)
+        depth = ys if window is None else ys + window[1].start
+        rgb[xs, ys] = self.water_colors[depth]
+
+    # Draw the particles on the screen
+    def draw(self, screen, cell_size) -> None:
+        for x, y in zip(*np.nonzero(self.kind)):
+            if self.kind[x, y] == SAND_LAYER:
+                color = SAND_COLOR
+            else:
+                color = self.water_colors[y]
+            pygame.draw.rect(
+                screen,
+                color,
+                (x * cell_size, y * cell_size, cell_size, cell_size),
+            )
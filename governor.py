@@ -0,0 +1,55 @@
+# Keeps ticks inside a time budget by giving up detail while they run long
+# levels is a list of (name, switch) in the order they're given up, where
+# switch(True) turns the level on (less detail) and switch(False) back off.
+# The tick time is smoothed; once it has been over budget for RAISE_AFTER
+# ticks in a row the next level goes on, and once it has been well under for
+# LOWER_AFTER ticks the last one goes back off
+class Governor:
+    RAISE_AFTER = 5
+    LOWER_AFTER = 60
+    HEADROOM = 0.6  # Under this part of the budget is well under
+    SMOOTHING = 0.2  # Weight of the newest tick in the average
+
+    def __init__(self, budget_ms: float, levels: list) -> None:
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.level = 0  # Number of levels on
+        self.average_ms = 0.0
+        self.over = 0  # Ticks in a row over budget
+        self.under = 0  # Ticks in a row well under budget
+        self.enabled = False
+
+    # Takes the time of a tick into account, turning a level on or off if needed
+    def record(self, tick_ms: float) -> None:
+        if not self.enabled:
+            return
+        self.average_ms += (tick_ms - self.average_ms) * self.SMOOTHING
+        if self.average_ms > self.budget_ms:
+            self.over += 1
+            self.under = 0
+        elif self.average_ms < self.budget_ms * self.HEADROOM:
+            self.under += 1
+            self.over = 0
+        else:
+            self.over = self.under = 0
+
+        if self.over >= self.RAISE_AFTER and self.level < len(self.levels):
+            self.levels[self.level][1](True)
+            self.level += 1
+            self.over = 0
+        elif self.under >= self.LOWER_AFTER and self.level > 0:
+            self.level -= 1
+            self.levels[self.level][1](False)
+            self.under = 0
+
+    # Gets the names of the levels that are on
+    def active(self) -> list[str]:
+        return [name for name, _ in self.levels[: self.level]]
+
+    # Turns every level back off (full detail)
+    def reset(self) -> None:
+        while self.level > 0:
+            self.level -= 1
+            self.levels[self.level][1](False)
+        self.average_ms = 0.0
+        self.over = self.under = 0
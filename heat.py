@@ -0,0 +1,139 @@
+import numpy as np
+from cell import *
+import cell
+
+
+# Spreads heat through the world
+# cell.temperature is how much hotter than the air each position is. Every
+# tick each position takes on part of the difference between the heat around
+# it and its own (a five point stencil over shifted slices), more the better
+# its layer conducts, then keeps part of its heat. Fire is held at
+# FIRE_TEMPERATURE, water soaks heat up and everything else slowly cools to
+# the air. Only the area that isn't at air temperature is worked on
+
+FIRE_TEMPERATURE = 800.0
+IGNITION_TEMPERATURE = 150.0  # Wood burns while it's at least this hot
+COLD = 1.0  # Heat under this is dropped, so the hot area can shrink
+
+# How well each layer takes on heat (0 to 1), indexed by layer
+CONDUCTIVITY = np.zeros(LAYER_COUNT, dtype=np.float32)
+CONDUCTIVITY[EMPTY_LAYER] = 0.3
+CONDUCTIVITY[SOLID_LAYER] = 0.2
+CONDUCTIVITY[SAND_LAYER] = 0.3
+CONDUCTIVITY[WATER_LAYER] = 0.8
+CONDUCTIVITY[FIRE_LAYER] = 1.0
+CONDUCTIVITY[SMOKE_LAYER] = 0.3
+# A position takes on at most a quarter of the difference to each of its four
+# neighbors, more would overshoot them
+_RATE = CONDUCTIVITY / 4
+
+# Part of its heat each layer keeps every tick
+KEEP = np.full(LAYER_COUNT, 0.98, dtype=np.float32)
+KEEP[WATER_LAYER] = 0.5
+# A step is heat * _OWN + (sum of the four around) * _AROUND, by layer
+_OWN = KEEP * (1 - 4 * _RATE)
+_AROUND = KEEP * _RATE
+
+FIRE = MATERIALS.index("fire")
+
+# Area (x0, x1, y0, y1) that can be hotter than the air, None when none is
+hot = None
+
+# Arrays the step works in, kept from tick to tick so a step doesn't allocate
+# (and fault in) new ones. Flat so any area fits in one whole, which NumPy
+# goes through much faster than part of a bigger 2D array
+_scratch = {}
+
+
+# Gets the scratch array of the name, with the shape
+def _buffer(name: str, shape: tuple[int, int], dtype):
+    size = shape[0] * shape[1]
+    buffer = _scratch.get(name)
+    if buffer is None or len(buffer) < size:
+        # Room to spare, the hot area mostly grows a bit at a time
+        buffer = _scratch[name] = np.empty(size + size // 4, dtype=dtype)
+    return buffer[:size].reshape(shape)
+
+
+# Forgets the hot area when the world is replaced, a new world is all at air
+# temperature. A loaded world's hot area is found in its temperature
+def reset(temperature=None) -> None:
+    global hot
+    hot = None
+    if temperature is None:
+        return
+    if not isinstance(temperature, np.ndarray):
+        # Only chunks with a block can be hot in a sparse world
+        hot = temperature.bounds()
+        return
+    rows = np.flatnonzero(temperature.any(axis=1))
+    if len(rows):
+        columns = np.flatnonzero(temperature.any(axis=0))
+        hot = (int(rows[0]), int(rows[-1]) + 1, int(columns[0]), int(columns[-1]) + 1)
+
+
+# Spreads the heat for one tick
+# Chunks that don't run this tick (see ChunkMap.running) keep their heat as it
+# is, fires in them included
+def step(grid) -> None:
+    global hot
+    width, height = grid.shape
+    count = store.count
+    fires = store.material[:count] == FIRE
+    if chunks.running is not None:
+        fires &= chunks.is_awake(store.x[:count], store.y[:count], chunks.running)
+    fires = np.flatnonzero(fires)
+    boxes = []
+    if len(fires):
+        xs, ys = store.x[fires], store.y[fires]
+        boxes.append((int(xs.min()), int(xs.max()) + 1, int(ys.min()), int(ys.max()) + 1))
+    if hot is not None:
+        boxes.append(hot)
+    if not boxes:
+        return
+
+    # Heat gets one position further each tick
+    x0 = max(0, min(box[0] for box in boxes) - 1)
+    x1 = min(width, max(box[1] for box in boxes) + 1)
+    y0 = max(0, min(box[2] for box in boxes) - 1)
+    y1 = min(height, max(box[3] for box in boxes) + 1)
+    if x0 >= x1 or y0 >= y1:
+        hot = None
+        return
+    shape = (x1 - x0, y1 - y0)
+    # Tables are looked up twice, that's quickest with intp indexes
+    layers = _buffer("layers", shape, np.intp)
+    np.copyto(layers, grid[x0:x1, y0:y1])
+    own = np.take(_OWN, layers, out=_buffer("own", shape, np.float32), mode="wrap")
+    spread = np.take(_AROUND, layers, out=_buffer("spread", shape, np.float32), mode="wrap")
+    if chunks.running is not None:
+        frozen = ~chunks.cell_mask(chunks.running, (slice(x0, x1), slice(y0, y1)))
+        np.putmask(own, frozen, 1)
+        np.putmask(spread, frozen, 0)
+    # The area with the positions around it, which are at air temperature
+    around = cell.heat_padded[x0 : x1 + 2, y0 : y1 + 2]  # A copy for sparse worlds
+    heat = around[1:-1, 1:-1]
+
+    total = np.add(around[:-2, 1:-1], around[2:, 1:-1], out=_buffer("total", shape, np.float32))
+    total += around[1:-1, :-2]
+    total += around[1:-1, 2:]
+    total *= spread
+    heat *= own
+    heat += total
+    heat *= np.greater_equal(heat, COLD, out=_buffer("warm", shape, bool))
+    if len(fires):
+        heat[xs - x0, ys - y0] = FIRE_TEMPERATURE
+    if not isinstance(cell.heat_padded, np.ndarray):
+        cell.temperature[x0:x1, y0:y1] = heat
+
+    rows = np.flatnonzero(heat.any(axis=1))
+    if len(rows) == 0:
+        hot = None
+        return
+    columns = np.flatnonzero(heat.any(axis=0))
+    hot = (
+        x0 + int(rows[0]),
+        x0 + int(rows[-1]) + 1,
+        y0 + int(columns[0]),
+        y0 + int(columns[-1]) + 1,
+    )
@@ -0,0 +1,195 @@
+import numpy as np
+from cell import *
+import cell
+
+
+# Levels connected bodies of water and acid
+# Each tick, cells on top of a body move straight to the lowest free cells
+# beside the body that have something under them (up to Liquid.spread cells
+# away along a row), as long as that's lower than where they are. Bodies are
+# found from the runs of liquid along each row, joined where runs in
+# neighboring rows touch. A level body has nothing to move, so it goes to sleep
+# A liquid is only leveled on the ticks it has a turn (see Scheduler)
+
+LIQUIDS = ["water", "acid"]
+
+
+# Gets the runs of True cells along each row (same y) of the mask as arrays
+# of y, start x and stop x, sorted by y then x
+def _runs(mask):
+    edges = np.diff(np.pad(mask.T, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    ys, starts = np.nonzero(edges == 1)
+    _, stops = np.nonzero(edges == -1)
+    return ys, starts, stops
+
+
+# Gets the body each run belongs to (runs touching across rows share a body),
+# as the lowest index of the runs in the body
+# Every pair of touching runs takes the lower of their two labels and every
+# label jumps to its own label, until nothing changes
+def _bodies(ys, starts, stops, width):
+    # Keys that sort runs by row then x, to find the runs of the row above
+    start_keys = ys * width + starts
+    stop_keys = ys * width + stops
+    above = (ys - 1) * width
+    first = np.searchsorted(stop_keys, above + starts, side="right")
+    last = np.searchsorted(start_keys, above + stops, side="left")
+    # Each run paired with each run above it that it touches
+    counts = np.maximum(last - first, 0)
+    runs = np.repeat(np.arange(len(ys)), counts)
+    others = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    labels = np.arange(len(ys))
+    while True:
+        lowest = np.minimum(labels[runs], labels[others])
+        joined = labels.copy()
+        np.minimum.at(joined, runs, lowest)
+        np.minimum.at(joined, others, lowest)
+        joined = joined[joined]
+        if (joined == labels).all():
+            return labels
+        labels = joined
+
+
+# Gets where the material's liquid is in the (x, y) slices of the grid
+def _liquid(material, xs: slice, ys: slice):
+    owned = np.asarray(cell.owners[xs, ys])
+    liquid = owned > 0
+    liquid[liquid] = store.material[owned[liquid] - 1] == material
+    return liquid
+
+
+def _level(grid, material, spread, awake) -> int:
+    count = store.count
+    slots = np.flatnonzero(store.material[:count] == material)
+    if len(slots) == 0:
+        return 0
+    xs, ys = store.x[slots], store.y[slots]
+    awake_cells = chunks.is_awake(xs, ys, awake)
+    if not awake_cells.any():
+        return 0
+
+    # Work in a window around the liquid in awake chunks, wide enough for the
+    # side spots and a row past it up and down. It grows until it holds the
+    # whole of every body it levels, so settled liquid elsewhere costs nothing
+    xs, ys = xs[awake_cells], ys[awake_cells]
+    box = (int(xs.min()), int(xs.max()) + 1, int(ys.min()), int(ys.max()) + 1)
+    while True:
+        x0 = max(0, box[0] - spread)
+        x1 = min(grid.shape[0], box[1] + spread)
+        y0 = max(0, box[2] - 1)
+        y1 = min(grid.shape[1], box[3] + 1)
+        width = x1 - x0
+        liquid = _liquid(material, slice(x0, x1), slice(y0, y1))
+        runs = _runs(liquid)
+        run_ys, run_starts, run_stops = runs
+        bodies = _bodies(*runs, width)
+        start_keys = run_ys * width + run_starts
+        # Only the bodies with liquid in an awake chunk are leveled, the others
+        # are settled
+        cell_runs = np.searchsorted(start_keys, (ys - y0) * width + xs - x0, side="right") - 1
+        leveled = np.zeros(len(run_ys), dtype=bool)
+        leveled[np.unique(bodies[cell_runs])] = True
+        leveled = leveled[bodies]
+        reach = (
+            x0 + int(run_starts[leveled].min()),
+            x0 + int(run_stops[leveled].max()),
+            y0 + int(run_ys[leveled].min()),
+            y0 + int(run_ys[leveled].max()) + 1,
+        )
+        grown = (
+            min(box[0], reach[0]),
+            max(box[1], reach[1]),
+            min(box[2], reach[2]),
+            max(box[3], reach[3]),
+        )
+        if grown == box:
+            break
+        box = grown
+
+    free = MOVES[WATER_LAYER][grid[x0:x1, y0:y1]]
+    # Whether the cell below can hold liquid up (the world's bottom does)
+    below = MOVES[WATER_LAYER][grid[x0:x1, y0 + 1 : y1 + 1]]
+    supported = np.ones_like(free)
+    supported[:, : below.shape[1]] = ~below
+
+    # Sources: liquid with nothing above it
+    top = np.ones_like(liquid)
+    top[:, 1:] = free[:, :-1]
+    if y0 > 0:
+        top[:, 0] = MOVES[WATER_LAYER][grid[x0:x1, y0 - 1]]
+    top &= liquid
+    source_x, source_y = np.nonzero(top)
+    source_run = np.searchsorted(start_keys, source_y * width + source_x, side="right") - 1
+    keep = leveled[source_run]
+    source_x, source_y = source_x[keep], source_y[keep]
+    source_body = bodies[source_run[keep]]
+
+    # Spots: free cells in the same row right beside a run, up to spread away
+    free_ys, free_starts, free_stops = _runs(free)
+    if len(free_ys) == 0:
+        return 0
+    free_start_keys = free_ys * width + free_starts
+    free_stop_keys = free_ys * width + free_stops
+    spot_x, spot_y, spot_body = [], [], []
+    # Free run starting where a liquid run stops (to its right)
+    right = np.searchsorted(free_start_keys, run_ys * width + run_stops)
+    right = np.minimum(right, len(free_ys) - 1)
+    has_right = free_start_keys[right] == run_ys * width + run_stops
+    # Free run stopping where a liquid run starts (to its left)
+    left = np.searchsorted(free_stop_keys, start_keys)
+    left = np.minimum(left, len(free_ys) - 1)
+    has_left = free_stop_keys[left] == start_keys
+    for run in np.flatnonzero((has_right | has_left) & leveled).tolist():
+        y = int(run_ys[run])
+        if has_right[run]:
+            stop = min(int(free_stops[right[run]]), int(run_stops[run]) + spread)
+            spot_x.extend(range(int(run_stops[run]), stop))
+            spot_y.extend([y] * (stop - int(run_stops[run])))
+            spot_body.extend([bodies[run]] * (stop - int(run_stops[run])))
+        if has_left[run]:
+            start = max(int(free_starts[left[run]]), int(run_starts[run]) - spread)
+            spot_x.extend(range(start, int(run_starts[run])))
+            spot_y.extend([y] * (int(run_starts[run]) - start))
+            spot_body.extend([bodies[run]] * (int(run_starts[run]) - start))
+    if not spot_x:
+        return 0
+    spot_x, spot_y, spot_body = map(np.array, (spot_x, spot_y, spot_body))
+    # A cell between two runs is next to both of them
+    _, unique = np.unique(spot_y * width + spot_x, return_index=True)
+    unique = unique[supported[spot_x[unique], spot_y[unique]]]
+    spot_x, spot_y, spot_body = spot_x[unique], spot_y[unique], spot_body[unique]
+
+    # Highest sources go to the lowest spots of the same body: with both
+    # sorted by body, the nth source of a body goes to the nth spot of it
+    sources = np.lexsort((source_y, source_body))
+    spots = np.lexsort((-spot_y, spot_body))
+    sorted_bodies = source_body[sources]
+    spot_bodies = spot_body[spots]
+    nth = np.arange(len(sources)) - np.searchsorted(sorted_bodies, sorted_bodies)
+    first_spot = np.searchsorted(spot_bodies, sorted_bodies)
+    spot_count = np.searchsorted(spot_bodies, sorted_bodies, side="right") - first_spot
+    paired = nth < spot_count
+    sources = sources[paired]
+    spots = spots[first_spot[paired] + nth[paired]]
+    lower = spot_y[spots] > source_y[sources]
+    sources, spots = sources[lower], spots[lower]
+
+    for sx, sy, tx, ty in zip(
+        source_x[sources].tolist(),
+        source_y[sources].tolist(),
+        spot_x[spots].tolist(),
+        spot_y[spots].tolist(),
+    ):
+        cell_at(sx + x0, sy + y0).move(grid, tx - sx, ty - sy)
+    return len(sources)
+
+
+# Levels every body of water and acid that has a turn this tick
+# turns has the chunk mask each material due this tick runs in, by material
+# Returns the number of cells that were moved
+def step(grid, turns: dict) -> int:
+    return sum(
+        _level(grid, MATERIALS.index(material), Liquid.spread, turns[material])
+        for material in LIQUIDS
+        if material in turns
+    )
@@ -1,5 +1,17 @@
-import sys
+import sys, time
 from cell import *
+from engine import ArrayEngine
+from parallel import ParallelEngine
+from render import SurfaceRenderer, FrameView, draw_cells
+from worker import SimWorker
+from camera import Camera
+from brush import Brush
+from governor import Governor
+from schedule import Scheduler
+from store import FIELDS
+from perf import profiler
+from recorder import Recorder, material_grid
+import snapshot, combustion, heat, liquid, cell
 import pygame, numpy as np
 from pygame.locals import *
 
@@ -7,28 +19,217 @@ from pygame.locals import *
 CELL_SIZE = 10
 SCREEN_WIDTH = 1080
 SCREEN_HEIGHT = 720
-grid = np.zeros(shape=(SCREEN_WIDTH // CELL_SIZE, SCREEN_HEIGHT // CELL_SIZE))
+
+# World size in cells, e.g. --world 1024x768 (one screen by default)
+# Arrow keys or dragging with the middle mouse button pan, the wheel zooms
+WORLD_SIZE = (SCREEN_WIDTH // CELL_SIZE, SCREEN_HEIGHT // CELL_SIZE)
+if "--world" in sys.argv:
+    WORLD_SIZE = tuple(int(n) for n in sys.argv[sys.argv.index("--world") + 1].split("x"))
+PAN_SPEED = 12  # Pixels per frame while an arrow key is held
+
+# Cells out from the middle of the brush, e.g. --brush 5 ([ and ] change it,
+# B switches between a circle and a square)
+BRUSH_RADIUS = 2
+if "--brush" in sys.argv:
+    BRUSH_RADIUS = int(sys.argv[sys.argv.index("--brush") + 1])
+
+# Chunks off screen only run every this many ticks (0 freezes them until they
+# are seen again), e.g. --offscreen 8
+OFFSCREEN_PERIOD = 4
+if "--offscreen" in sys.argv:
+    OFFSCREEN_PERIOD = int(sys.argv[sys.argv.index("--offscreen") + 1])
+
+# Simulation engine for sand and water:
+# "objects" updates one Cell per particle, "numpy" uses the ArrayEngine and
+# "parallel" splits the ArrayEngine's work over worker processes
+SIM_ENGINE = "objects"
+if "--numpy" in sys.argv:
+    SIM_ENGINE = "numpy"
+elif "--parallel" in sys.argv:
+    SIM_ENGINE = "parallel"
+
+# Runs the simulation on its own thread, drawing the last finished tick every frame
+THREADED = "--threaded" in sys.argv
+
+# Time a tick should fit in (one frame at 60 fps), e.g. --budget 25. While
+# ticks run longer the governor gives up detail level by level (see LEVELS)
+TICK_BUDGET_MS = 16.0
+if "--budget" in sys.argv:
+    TICK_BUDGET_MS = float(sys.argv[sys.argv.index("--budget") + 1])
+
+# Stores the world in chunks that are only allocated once something is in them,
+# so memory goes with the area in use instead of the world's size (objects
+# engine only)
+SPARSE = "--sparse" in sys.argv
+
+# Renderer: "surface" draws the grid in one bulk blit, "cells" draws one rect per cell
+# (the simulation thread always paints surface frames)
+RENDERER = "cells" if "--draw-cells" in sys.argv and not THREADED else "surface"
+
+SNAPSHOT_PATH = "world.snap"  # Saved with S, loaded with L
+
+# Checks the grid against the cells after every tick (slow, for debugging)
+DEBUG = "--debug" in sys.argv
+
+# Phase timings, particle counts and moves per frame: --hud shows them on screen
+# (F3 toggles it) and --profile FILE writes them to a JSON lines or .csv file
+SHOW_HUD = "--hud" in sys.argv
+PROFILE_PATH = sys.argv[sys.argv.index("--profile") + 1] if "--profile" in sys.argv else None
+
+# Records the material grid every tick to a file (python recorder.py FILE plays it)
+RECORD_PATH = sys.argv[sys.argv.index("--record") + 1] if "--record" in sys.argv else None
 
 
 clock = pygame.time.Clock()
 timer = pygame.time.get_ticks()
-CellFramePerUpdate = 30  # Number of frames per second for the cell update
-GhostCellFix = 0
+CellFramePerUpdate = 30  # Milliseconds between cell updates
 
 cell_type = "solid"  # Default cell type
-cells = {
-    "fire": [],
-    "smoke": [],
-    "acid": [],
-    "water": [],
-    "sand": [],
-    "wood": [],
-    "solid": [],
-    "destroy": [],
-    "examine": [],
-    "time slow": [],
-}  # Dictionary to hold cell types and their instances
-valid_substance = list(cells.keys()) + ["empty"]  # valid substances each cell can be
+cells = {material: [] for material in MATERIALS}  # The cells of each type
+# What the right mouse button cycles through (every material and the tools)
+valid_substance = MATERIALS + ["examine", "empty"]
+
+# Cell types that get updated, in order (bottom-up: the ones that fall, then the
+# ones that rise). Each is updated on the ticks its period and phase give it
+UPDATE_ORDER = update_order()
+scheduler = Scheduler(UPDATE_ORDER, REGISTRY)
+
+profiler.phases = ["events", "engine"] + ["update_" + material for material in UPDATE_ORDER]
+profiler.phases += ["liquid", "heat", "combustion"] + ["validate"] * DEBUG
+profiler.phases += ["record"] * (RECORD_PATH is not None) + ["draw"]
+if SHOW_HUD or PROFILE_PATH:
+    profiler.enable(PROFILE_PATH)
+
+
+def new_world(width, height, sim_engine=SIM_ENGINE, seed=None, sparse=SPARSE):
+    """
+    Start a new empty world of width x height cells.
+    The seed makes the randomness (cells' and engine's) repeatable.
+    A sparse world only works with the objects engine, the array engines need
+    the whole grid as one array."""
+
+    global grid, engine, renderer, world_engine
+
+    if sparse and sim_engine != "objects":
+        raise ValueError(f"a sparse world can't use the {sim_engine} engine")
+    if engine is not None:
+        engine.close()
+    randoms.seed(seed)
+    # Layers are small ints so rule code can index tables with them directly
+    padded, grid = new_grid((width, height), sparse=sparse)
+    reset_cells(grid.shape, sparse)
+    heat.reset()
+    scheduler.reset()
+    # A new world starts out with full detail
+    governor.reset()
+    camera.set_world(grid.shape)
+    for celltype in cells:
+        cells[celltype].clear()
+    engine = None
+    if sim_engine == "numpy":
+        engine = ArrayEngine(grid, randoms.generator, chunks)
+    elif sim_engine == "parallel":
+        # Workers are seeded from a number drawn from the pool
+        worker_seed = int(randoms.generator.integers(2**63))
+        engine = ParallelEngine(grid.shape, worker_seed, chunks)
+        padded, grid = engine.padded, engine.grid
+    attach_world(padded, engine)
+    renderer = (
+        SurfaceRenderer(grid.shape, CELL_SIZE, chunks) if RENDERER == "surface" else None
+    )
+    world_engine = sim_engine
+
+
+def world_fields():
+    """
+    Get the (name, array) of each per position array a snapshot holds, besides
+    the engine's."""
+    return [("grid", grid), ("health", cell.health), ("temperature", cell.temperature)]
+
+
+def save_world(path):
+    """
+    Save the whole simulation (grid, cells, engine and random state) to a file."""
+    metadata = {
+        "width": grid.shape[0],
+        "height": grid.shape[1],
+        "engine": world_engine,
+        "sparse": not isinstance(grid, np.ndarray),
+        "random_state": randoms.state(),
+        "ticks": chunks.ticks,
+        "engine_state": engine.state() if engine is not None else None,
+    }
+    arrays = {}
+    for name in FIELDS:
+        arrays["cell_" + name] = getattr(store, name)[: store.count]
+    arrays.update(cell_order(cells))
+    arrays["chunks_pending"] = chunks.pending
+    arrays.update(scheduler.state())
+    for name, field in world_fields():
+        if isinstance(field, np.ndarray):
+            arrays[name] = field
+        else:
+            # A sparse world saves just the chunks in use
+            arrays[name + "_chunks"], arrays[name + "_blocks"] = field.state()
+    if engine is not None:
+        arrays["kind"] = engine.kind
+        arrays["direction"] = engine.direction
+    snapshot.write(path, metadata, arrays)
+
+
+def load_world(path):
+    """
+    Replace the simulation with one saved by save_world."""
+    metadata, arrays = snapshot.read(path)
+    new_world(
+        metadata["width"],
+        metadata["height"],
+        metadata["engine"],
+        sparse=metadata["sparse"],
+    )
+    load_cells({name: arrays["cell_" + name] for name in FIELDS}, cells, arrays)
+    chunks.pending[:] = arrays["chunks_pending"]
+    # Materials take their turns from the saved tick on
+    chunks.ticks = metadata["ticks"]
+    scheduler.set_state(arrays)
+    for name, field in world_fields():
+        if isinstance(field, np.ndarray):
+            field[:] = arrays[name]
+        else:
+            field.set_state(arrays[name + "_chunks"], arrays[name + "_blocks"])
+    heat.reset(cell.temperature)
+    if engine is not None:
+        engine.kind[:] = arrays["kind"]
+        engine.direction[:] = arrays["direction"]
+        engine.set_state(metadata["engine_state"])
+    randoms.set_state(metadata["random_state"])
+
+
+engine = None
+camera = Camera((SCREEN_WIDTH, SCREEN_HEIGHT), CELL_SIZE)
+
+
+def due_slots(material, awake):
+    """
+    Get the slots of the cells of the type that are in the awake chunks (a
+    chunk mask from the scheduler), in order. Read right before they're
+    updated, since the slots change as cells are removed. Cells in asleep
+    chunks are skipped without being looked at one by one."""
+    count = store.count
+    slots = np.flatnonzero(store.material[:count] == REGISTRY[material].id)
+    return slots[chunks.is_awake(store.x[slots], store.y[slots], awake)]
+
+
+def material_counts():
+    """
+    Get the number of particles of each material (cells and engine particles)."""
+    counts = np.bincount(store.material[: store.count], minlength=len(MATERIALS))
+    counts = dict(zip(MATERIALS, counts.tolist()))
+    if engine is not None:
+        for name, material in REGISTRY.items():
+            if material.particle is not None:
+                counts[name] += engine.count(material.particle)
+    return counts
 
 
 def update(dt):
@@ -40,104 +241,363 @@ def update(dt):
     x += v * dt
     and this will scale your velocity based on time. Extend as necessary."""
 
-    global cell_type, timer, CellFramePerUpdate, GhostCellFix
+    global cell_type, timer, SHOW_HUD, stroke_end
 
+    # The simulation thread has the profiler to itself
+    start = profiler.start() if sim is None else 0.0
+    painted = []  # (xs, ys) the brush covered this frame
     for event in pygame.event.get():
         if event.type == QUIT:
+            if sim is not None:
+                sim.stop()
+            stop_recording()
             pygame.quit()
             sys.exit()
 
+        if event.type == MOUSEWHEEL:
+            camera.zoom_at(*pygame.mouse.get_pos(), event.y)
+        elif event.type == MOUSEMOTION and event.buttons[1]:
+            camera.pan(-event.rel[0], -event.rel[1])
+
+        if event.type == KEYDOWN:
+            if event.key == K_s:
+                send("save", SNAPSHOT_PATH)
+            elif event.key == K_l:
+                send("load", SNAPSHOT_PATH)
+            elif event.key == K_F3:
+                SHOW_HUD = not SHOW_HUD
+                send("profile", SHOW_HUD)
+            elif event.key == K_LEFTBRACKET:
+                brush.resize(-1)
+            elif event.key == K_RIGHTBRACKET:
+                brush.resize(1)
+            elif event.key == K_b:
+                brush.cycle()
+
         # Change selected type
         if event.type == pygame.MOUSEBUTTONDOWN:
             if pygame.mouse.get_pressed()[2]:
                 cell_type = valid_substance[valid_substance.index(cell_type) - 1]
+            elif event.button == 1:
+                stroke_end = camera.to_world(*event.pos)
+                painted.append(brush.stroke(stroke_end, stroke_end))
+        # Every mouse position is joined to the one before it, so fast
+        # strokes leave no gaps
+        elif event.type == MOUSEMOTION and event.buttons[0] and stroke_end is not None:
+            end = camera.to_world(*event.pos)
+            painted.append(brush.stroke(stroke_end, end))
+            stroke_end = end
 
-        if pygame.mouse.get_pressed()[0]:
-            # Snap to grid
-            x = int(pygame.mouse.get_pos()[0] // CELL_SIZE)
-            y = int(pygame.mouse.get_pos()[1] // CELL_SIZE)
-            if cell_type == "empty":
-                # Remove the cell from the list
-                for celltype in cells:  # for each cell type
-                    for cell in cells[celltype]:  # for each cell in the list
-                        if cell.position == (x, y):
-                            cell.remove(grid, cells)
-            elif cell_type == "examine":
-                print(grid[x, y])
-            elif grid[x, y] == 0:
-                # Set the cell to a color
-                # grid[x, y] = 2 if cell_type in ["water", "fire"] else 1
-                # cells[f"{cell_type}"].append(Cell(cell_type, (x, y)))
-                if cell_type == "wood":
-                    cells["wood"].append(BurnSolid((x, y)))
-                    grid[x, y] = SOLID_LAYER
-                elif cell_type == "solid":
-                    cells["solid"].append(Solid((x, y)))
-                    grid[x, y] = SOLID_LAYER
-                elif cell_type == "water":
-                    cells["water"].append(Water((x, y)))
-                    grid[x, y] = WATER_LAYER
-                elif cell_type == "sand":
-                    cells["sand"].append(Sand((x, y)))
-                    grid[x, y] = SAND_LAYER
-                elif cell_type == "fire":
-                    cells["fire"].append(Fire((x, y)))
-                    grid[x, y] = FIRE_LAYER
-                elif cell_type == "destroy":
-                    cells["destroy"].append(Destroy((x, y)))
-                    grid[x, y] = EMPTY_LAYER
-                elif cell_type == "acid":
-                    cells["acid"].append(Acid((x, y)))
-                    grid[x, y] = WATER_LAYER
-                elif cell_type == "time slow":
-                    cell_ = Solid((x, y))
-                    cell_.color = (255, 0, 255)
-                    cell_.cell_type = "time slow"
-                    cells["time slow"].append(cell_)
-                    grid[x, y] = SOLID_LAYER
-
-    if pygame.time.get_ticks() - timer > CellFramePerUpdate:
-        if len(cells["time slow"]) > 0:
-            CellFramePerUpdate = 300
+    if pygame.mouse.get_pressed()[0]:
+        x, y = camera.to_world(*pygame.mouse.get_pos())
+        if cell_type == "examine":
+            # Snap to grid (the world can end before the screen does)
+            if 0 <= x < grid.shape[0] and 0 <= y < grid.shape[1]:
+                send("examine", x, y)
         else:
-            CellFramePerUpdate = 30
-
-        for cell in (
-            cells["sand"]
-            + cells["water"]
-            + cells["acid"]
-            + cells["fire"]
-            + cells["smoke"]
-            + cells["destroy"]
-        ):
-            cell.update(grid, cells)
+            # Holding the brush still keeps pouring
+            if not painted:
+                painted.append(brush.stroke((x, y), (x, y)))
+            xs = np.concatenate([xs for xs, _ in painted])
+            ys = np.concatenate([ys for _, ys in painted])
+            if cell_type == "empty":
+                send("erase", xs, ys)
+            else:
+                send("place", cell_type, xs, ys)
+        stroke_end = (x, y)
+    else:
+        stroke_end = None
+
+    keys = pygame.key.get_pressed()
+    dx = keys[K_RIGHT] - keys[K_LEFT]
+    dy = keys[K_DOWN] - keys[K_UP]
+    if dx or dy:
+        camera.pan(dx * PAN_SPEED, dy * PAN_SPEED)
+    if sim is None:
+        profiler.stop("events", start)
+
+    if sim is None and pygame.time.get_ticks() - timer > CellFramePerUpdate:
+        tick()
         timer = pygame.time.get_ticks()
 
-        GhostCellFix += 1
-        if GhostCellFix >= 20:
-            for celltype in cells.keys():
-                for cell in cells[celltype]:
-                    cell.fix(grid)
+
+def send(*command):
+    """
+    Make an edit to the world, right away or (with the simulation thread
+    running) between its ticks."""
+    if sim is not None:
+        sim.send(command)
+    else:
+        handle(command)
+
+
+def handle(command):
+    """
+    Apply an edit sent with send."""
+    name, *args = command
+    if name == "place":
+        place_cells(*args)
+    elif name == "erase":
+        erase_cells(*args)
+    elif name == "examine":
+        print(grid[args[0], args[1]])
+    elif name == "save":
+        save_world(*args)
+    elif name == "load":
+        load_world(*args)
+    elif name == "profile":
+        if args[0]:
+            profiler.enable(PROFILE_PATH)
+        elif PROFILE_PATH is None:
+            profiler.disable()
+
+
+def place_cells(cell_type, xs, ys):
+    """
+    Place new cells of the type at the positions (arrays of x and y) that are
+    in the world and empty, all in one go."""
+    xs, ys = unique_positions(xs, ys, grid.shape)
+    material = REGISTRY[cell_type]
+    if engine is not None and material.particle is not None:
+        engine.spawn_many(xs, ys, material.particle)
+    else:
+        place_many(material.cell_class, xs, ys, grid, cells)
+
+
+def erase_cells(xs, ys):
+    """
+    Remove whatever cells are at the positions (arrays of x and y)."""
+    xs, ys = unique_positions(xs, ys, grid.shape)
+    remove_many(xs, ys, grid, cells)
+    if engine is not None:
+        engine.erase_many(xs, ys)
+
+
+def place_cell(cell_type, x, y):
+    """
+    Place a new cell of the type at (x, y) if the spot is empty."""
+    place_cells(cell_type, [x], [y])
+
+
+def erase_cell(x, y):
+    """
+    Remove whatever cell is at (x, y)."""
+    erase_cells([x], [y])
+
+
+def shade_water(off):
+    """
+    Stop (or start again) recoloring water by depth as it moves."""
+    Water.shading = not off
+
+
+def halve_smoke(on):
+    """
+    Update smoke every other tick (or every tick again)."""
+    REGISTRY["smoke"].period = 2 if on else 1
+
+
+def age_faster(on):
+    """
+    Make smoke and fire burn out twice as fast (or normally again)."""
+    Smoke.aging = Fire.aging = 2 if on else 1
+
+
+def freeze_offscreen(on):
+    """
+    Stop running the chunks off screen (or run them every OFFSCREEN_PERIOD
+    ticks again)."""
+    if chunks.period != 1:
+        chunks.period = 0 if on else OFFSCREEN_PERIOD
+
+
+# Detail the governor gives up while ticks run over budget, in order
+LEVELS = [
+    ("no water shading", shade_water),
+    ("smoke at half rate", halve_smoke),
+    ("short lifetimes", age_faster),
+    ("frozen off screen", freeze_offscreen),
+]
+governor = Governor(TICK_BUDGET_MS, LEVELS)  # Enabled with a window
+new_world(*WORLD_SIZE)
+
+
+def tick():
+    """
+    Advance the simulation by one step.
+    Returns the number of particles that were updated."""
+
+    tick_start = time.perf_counter()
+    updates = 0
+    collect_pools()
+    release_chunks()
+    if chunks.period != 1:
+        chunks.watch(*camera.window())
+    if cells["time slow"] or chunks.slow is not None:
+        xs, ys = np.array([cell.position for cell in cells["time slow"]]).reshape(-1, 2).T
+        chunks.dilate(xs, ys, TimeSlow.reach, TimeSlow.dilation)
+    chunks.advance()
+    if engine is not None:
+        # Destroy cells don't know about the engine's particles
+        start = profiler.start()
+        for cell in cells["destroy"]:
+            engine.erase(*cell.position)
+        updates += engine.step()
+        profiler.stop("engine", start)
+
+    # Only the materials due this tick are looked at
+    turns = scheduler.due(chunks)
+    for material, awake in turns:
+        start = profiler.start()
+        slots = due_slots(material, awake)
+        # Each material updates all of its cells at once through its batch hook
+        if len(slots):
+            updates += REGISTRY[material].update(grid, cells, slots)
+        profiler.stop("update_" + material, start)
+
+    start = profiler.start()
+    liquid.step(grid, dict(turns))
+    profiler.stop("liquid", start)
+
+    start = profiler.start()
+    heat.step(grid)
+    profiler.stop("heat", start)
+
+    start = profiler.start()
+    combustion.step(grid, cells)
+    profiler.stop("combustion", start)
+
+    if DEBUG:
+        start = profiler.start()
+        validate(grid)
+        profiler.stop("validate", start)
+
+    if recorder is not None:
+        start = profiler.start()
+        recorder.record(material_grid(grid.shape, engine))
+        profiler.stop("record", start)
+    governor.record((time.perf_counter() - tick_start) * 1000)
+    return updates
+
+
+def start_recording(path):
+    """
+    Record every tick from now on to a file (see recorder.py)."""
+    global recorder
+    stop_recording()
+    recorder = Recorder(path)
+
+
+def stop_recording():
+    """
+    Finish the recording, if there is one."""
+    global recorder
+    if recorder is not None:
+        recorder.close()
+    recorder = None
+
+
+recorder = None
+
+
+def run_headless(ticks):
+    """
+    Run the simulation for a number of ticks without a window or a clock.
+    Returns the number of particle updates.
+    With the profiler on, every tick is one frame."""
+    updates = 0
+    for _ in range(ticks):
+        updates += tick()
+        if profiler.enabled:
+            profiler.frame(frame_stats())
+    return updates
+
+
+def frame_stats():
+    """
+    Get what the profiler records about a frame besides its timings: the
+    particle count of each material and how many governor levels are on."""
+    return {**material_counts(), "governor_level": governor.level}
+
+
+def sim_step():
+    """
+    Run one tick on the simulation thread (a frame for the profiler too)."""
+    tick()
+    if profiler.enabled:
+        profiler.frame(frame_stats())
+
+
+def sim_paint():
+    """
+    Get the part of the grid the camera sees, its colors and its position for a
+    frame of the simulation thread."""
+    window = camera.window()
+    return grid[window], renderer.paint(engine, window), (window[0].start, window[1].start)
+
+
+def tick_interval():
+    """
+    Get the time between ticks in milliseconds."""
+    return CellFramePerUpdate
 
 
 def draw(screen, text_font, text_rect):
     """
     Draw things to the window. Called once per frame.
     """
-    screen.fill((0, 0, 0))
+    start = profiler.start() if sim is None else 0.0
+    if sim is not None:
+        frame_view.draw(screen, sim.frames.read(), camera)
+    elif renderer is not None:
+        renderer.draw(screen, engine, camera)
+    else:
+        screen.fill((0, 0, 0))
+        draw_cells(screen, cells, CELL_SIZE, engine)
 
-    for celltype in cells:
-        for cell in cells[celltype]:
-            cell.draw(pygame.display.get_surface(), CELL_SIZE)
-
-    text = text_font.render(cell_type.upper(), True, (0, 255, 0))
+    label = cell_type.upper()
+    if cell_type != "examine":
+        label += f"  {brush.shape} {brush.radius}"
+    text = text_font.render(label, True, (0, 255, 0))
     screen.blit(text, text_rect)
+    if sim is None:
+        profiler.stop("draw", start)
+
+    if SHOW_HUD:
+        draw_hud(screen, text_rect)
 
     # Flip the display so that the things we drew actually show up.
     pygame.display.flip()
 
 
+def draw_hud(screen, text_rect):
+    """
+    Draw the last frame's timings and counts under the cell type label."""
+    global hud_font
+    if hud_font is None:
+        hud_font = pygame.font.Font("freesansbold.ttf", 14)
+    y = text_rect.bottom + 4
+    lines = [f"fps: {clock.get_fps():.1f}"]
+    if governor.level:
+        lines.append("governor: " + ", ".join(governor.active()))
+    if sim is not None:
+        lines.append(f"tick: {sim.frames.read().tick_ms:.1f} ms")
+    for line in lines + profiler.lines():
+        text = hud_font.render(line, True, (0, 255, 0))
+        screen.blit(text, (text_rect.left, y))
+        y += text.get_height()
+
+
+hud_font = None
+brush = Brush(BRUSH_RADIUS)
+stroke_end = None  # World position the brush was last at while held
+sim = None  # Simulation thread (with --threaded)
+frame_view = FrameView()
+
+
 def runPyGame():
+    global sim
+
     # Initialise PyGame.
     pygame.init()
 
@@ -153,13 +613,26 @@ def runPyGame():
     # width, height = 640, 640
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 
+    # Only the chunks on screen run every tick while there's a window, which
+    # also gets detail turned down when ticks run long
+    chunks.period = OFFSCREEN_PERIOD
+    governor.enabled = True
+    if RECORD_PATH is not None:
+        start_recording(RECORD_PATH)
+    if THREADED:
+        sim = SimWorker(grid.shape, handle, sim_step, sim_paint, tick_interval)
+        sim.start()
+
     # Main game loop.
     dt = 1 / fps
     while True:
         update(dt)
         draw(screen, text_font, text_rect)
         clock.tick()
-        # print(clock.get_fps())
+        if sim is not None:
+            sim.check()
+        elif profiler.enabled:
+            profiler.frame(frame_stats())
         dt = fpsClock.tick(fps)
 
 
@@ -168,12 +641,10 @@ if __name__ == "__main__":
 
 
 # TO ADD (According to Pizza and Rick):
-# Mud -- Like clay but really soft
 # Muddy Mud Mud -- Well, it's like... s-sand but hard?
 # Clay -- Like mud but really hard
 # Limestone -- Stone that is lime
 # Wood -- For making houses
 # Bricks -- Hard course material?
 # High quality wood -- Fresh off the tree that you chop from trees. Perfect.
-# Temperature(?)
 # Glass -- looks cool according to pizza
@@ -0,0 +1,70 @@
+# Everything the simulation knows about each material, as data
+# Adding a material is one register() call: the cell lists, the right click
+# menu, placement, the update order, the move table and the recording palette
+# are all made from the registry
+#   layer       grid layer it's on (materials on the same layer move the same way)
+#   color       color of its cells, each darkened by up to variation
+#   displaces   layers it can move into, swapping places with what's there
+#   lifetime    ticks its cells start out with (0 = they don't run out)
+#   durability  health its cells start out with; cells with health burn and
+#               are eaten by acid (0 = neither)
+#   update      batch hook update(grid, cell_dict, slots) that updates every
+#               awake cell of the material at once and returns how many it
+#               updated (None = its cells never change on their own)
+#   rank        place in the update order, the materials that fall before the
+#               ones that rise (only for materials with an update)
+#   period      ticks between updates and phase which of them it's on (see Scheduler)
+#   particle    layer of the array engine particle it's placed as when there is
+#               an engine (None = it's always a cell)
+#   cell_class  class of its cell objects (cell.py makes one from the data when
+#               it's left out)
+class Material:
+    def __init__(
+        self,
+        name: str,
+        layer: int,
+        color: tuple[int, int, int],
+        displaces=(),
+        variation: int = 0,
+        lifetime: int = 0,
+        durability: int = 0,
+        update=None,
+        rank=None,
+        period: int = 1,
+        phase: int = 0,
+        particle=None,
+        cell_class=None,
+    ) -> None:
+        self.name = name
+        self.layer = layer
+        self.color = color
+        self.displaces = list(displaces)
+        self.variation = variation
+        self.lifetime = lifetime
+        self.durability = durability
+        self.update = update
+        self.rank = rank
+        self.period = period
+        self.phase = phase
+        self.particle = particle
+        self.cell_class = cell_class
+        self.id = -1  # Index in the registry, stored in the cell store
+
+
+# The materials by name, in id order (ids are saved in snapshots and
+# recordings, so new materials go at the end)
+REGISTRY: dict[str, Material] = {}
+
+
+def register(material: Material) -> Material:
+    if material.name in REGISTRY:
+        raise ValueError(f"material {material.name!r} is already registered")
+    material.id = len(REGISTRY)
+    REGISTRY[material.name] = material
+    return material
+
+
+# Gets the names of the materials that update, in update order
+def update_order() -> list[str]:
+    updating = [material for material in REGISTRY.values() if material.update is not None]
+    return [material.name for material in sorted(updating, key=lambda material: material.rank)]
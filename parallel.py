@@ -0,0 +1,162 @@
+import atexit, os, multiprocessing
+from multiprocessing import shared_memory
+from typing import Optional
+import numpy as np
+from chunks import ChunkMap
+from engine import ArrayEngine
+from cell import new_grid
+from perf import profiler
+
+
+# Tiles need to be at least this wide so that two tiles running at the same
+# time never reach the same column (each one can write one column past its edges)
+MIN_TILE_WIDTH = 3
+
+# State of the engine inside a worker process
+_worker = None
+
+
+# Makes a NumPy array in a new block of shared memory
+def _shared_array(shape, dtype):
+    dtype = np.dtype(dtype)
+    size = max(1, int(np.prod(shape)) * dtype.itemsize)
+    memory = shared_memory.SharedMemory(create=True, size=size)
+    return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+# Opens the shared arrays made by the main process
+def _attach(specs):
+    memories, arrays = [], {}
+    for name, (memory_name, shape, dtype) in specs.items():
+        memory = shared_memory.SharedMemory(name=memory_name)
+        memories.append(memory)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    return memories, arrays
+
+
+def _init_worker(specs, chunk_size) -> None:
+    global _worker
+    memories, arrays = _attach(specs)
+    chunks = None
+    if "awake" in arrays:
+        chunks = ChunkMap(arrays["kind"].shape, chunk_size)
+        chunks.awake, chunks.pending, chunks.dirty = (
+            arrays["awake"],
+            arrays["pending"],
+            arrays["dirty"],
+        )
+    grid = arrays["padded"][1:-1, 1:-1]
+    engine = ArrayEngine(grid, None, chunks, arrays["kind"], arrays["direction"])
+    # Keep the shared memory open for as long as the worker lives
+    _worker = (memories, engine, arrays["done"])
+
+
+def _step_tile(job) -> int:
+    region, seed = job
+    _, engine, done = _worker
+    # Seeded per tile and tick so runs repeat no matter which worker gets the tile
+    engine.rng = np.random.default_rng(seed)
+    profiler.moves = 0
+    return engine.step(region, done), profiler.moves
+
+
+# Array engine that splits the world into vertical tiles simulated by worker
+# processes over shared memory
+# Tiles run in two phases (even tiles, then odd tiles) so neighboring tiles are
+# never updated at the same time. Each tile reads and writes a one column halo
+# on both sides, so particles cross tile borders by moving into the halo. The
+# pool finishing a phase is the barrier that makes those moves visible to the
+# neighbors before they run
+class ParallelEngine(ArrayEngine):
+    def __init__(
+        self,
+        shape: tuple[int, int],
+        seed: Optional[int] = None,
+        chunks=None,
+        workers: Optional[int] = None,
+    ) -> None:
+        workers = workers or os.cpu_count() or 1
+        self.memories = []
+        specs = {}
+        arrays = {}
+        fields = {
+            "padded": ((shape[0] + 2, shape[1] + 2), np.int8),
+            "kind": (shape, np.int8),
+            "direction": (shape, np.int8),
+            "done": (shape, bool),
+        }
+        if chunks is not None:
+            for name in ("awake", "pending", "dirty"):
+                fields[name] = (getattr(chunks, name).shape, bool)
+        for name, (field_shape, dtype) in fields.items():
+            memory, array = _shared_array(field_shape, dtype)
+            self.memories.append(memory)
+            arrays[name] = array
+            specs[name] = (memory.name, field_shape, np.dtype(dtype))
+
+        # Move the chunk flags into shared memory so workers can read and wake them
+        if chunks is not None:
+            for name in ("awake", "pending", "dirty"):
+                arrays[name][:] = getattr(chunks, name)
+                setattr(chunks, name, arrays[name])
+
+        self.padded, grid = new_grid(shape, arrays["padded"])
+        arrays["kind"][:] = 0
+        super().__init__(grid, seed, chunks, arrays["kind"], arrays["direction"])
+        self.done = arrays["done"]
+        self.seed = seed if seed is not None else np.random.SeedSequence().entropy
+        self.ticks = 0
+
+        # Two tiles per worker so each phase keeps every worker busy
+        count = max(1, min(2 * workers, shape[0] // MIN_TILE_WIDTH))
+        edges = np.linspace(0, shape[0], count + 1).astype(int)
+        self.tiles = list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+        self.workers = workers
+        self.specs = specs
+        self.pool = None
+        atexit.register(self.close)
+
+    def step(self) -> int:
+        # Started on the first step so importing a module that makes an engine
+        # never starts processes by itself
+        if self.pool is None:
+            chunk_size = self.chunks.size if self.chunks is not None else 0
+            self.pool = multiprocessing.Pool(
+                self.workers, initializer=_init_worker, initargs=(self.specs, chunk_size)
+            )
+        self.done[:] = False
+        updates = 0
+        for phase in (0, 1):
+            jobs = [
+                (tile, (self.seed, self.ticks, index))
+                for index, tile in enumerate(self.tiles)
+                if index % 2 == phase
+            ]
+            for tile_updates, moves in self.pool.map(_step_tile, jobs):
+                updates += tile_updates
+                profiler.moves += moves
+        self.ticks += 1
+        return updates
+
+    # Workers seed from these every tick
+    def state(self) -> dict:
+        return {**super().state(), "seed": self.seed, "ticks": self.ticks}
+
+    def set_state(self, state: dict) -> None:
+        super().set_state(state)
+        self.seed = state["seed"]
+        self.ticks = state["ticks"]
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        for memory in self.memories:
+            memory.unlink()
+            try:
+                memory.close()
+            except BufferError:
+                # Arrays still point into it, it's freed once they are gone
+                pass
+        self.memories = []
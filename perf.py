@@ -0,0 +1,92 @@
+import csv, json, time
+
+
+# Times each phase of a frame and counts what happened in it
+# Phases are timed between start() and stop(), which do nothing while the
+# profiler is disabled. Moves are always counted since that's just an add
+class Profiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.phases = []  # Phases every record has (even when they didn't run)
+        self.moves = 0  # Moves made since the last frame (cells and particles)
+        self.times = {}  # Seconds spent in each phase this frame
+        self.frames = 0
+        self.last = None  # The last finished frame's record
+        self.file = None
+        self.csv = False
+        self.writer = None  # Made from the first record's columns
+
+    # Starts timing (and writing a record per frame to the file, if given)
+    # Files ending in .csv get CSV, anything else gets JSON lines
+    def enable(self, path=None) -> None:
+        self.enabled = True
+        if path is not None and self.file is None:
+            self.file = open(path, "w", newline="")
+            self.csv = path.endswith(".csv")
+
+    def disable(self) -> None:
+        self.enabled = False
+        self.close()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+        self.file = None
+        self.writer = None
+
+    def start(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def stop(self, phase: str, start: float) -> None:
+        if self.enabled:
+            self.times[phase] = self.times.get(phase, 0.0) + time.perf_counter() - start
+
+    # Finishes the frame with the particle counts (per material)
+    # Returns the frame's record, or None while disabled
+    def frame(self, counts: dict):
+        moves = self.moves
+        self.moves = 0
+        if not self.enabled:
+            self.times.clear()
+            return None
+        record = {"frame": self.frames, "moves": moves}
+        for phase in self.phases:
+            record[phase + "_ms"] = 0.0
+        for phase, seconds in self.times.items():
+            record[phase + "_ms"] = round(seconds * 1000, 3)
+        record.update(counts)
+        self.times.clear()
+        self.frames += 1
+        self.last = record
+        self._write(record)
+        return record
+
+    def _write(self, record: dict) -> None:
+        if self.file is None:
+            return
+        if not self.csv:
+            self.file.write(json.dumps(record) + "\n")
+            return
+        if self.writer is None:
+            self.writer = csv.DictWriter(
+                self.file, list(record), restval="", extrasaction="ignore"
+            )
+            self.writer.writeheader()
+        self.writer.writerow(record)
+
+    # Gets the lines to show on screen for the last frame
+    def lines(self) -> list[str]:
+        if self.last is None:
+            return []
+        phases = [key for key in self.last if key.endswith("_ms")]
+        # Materials that aren't there would just be noise
+        counts = [
+            key for key in self.last if key not in phases and key != "frame" and self.last[key]
+        ]
+        lines = [f"{key[:-3]}: {self.last[key]:.2f} ms" for key in phases]
+        lines += [f"{key}: {self.last[key]}" for key in counts]
+        return lines
+
+
+# Shared by the simulation modules
+profiler = Profiler()
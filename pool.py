@@ -0,0 +1,43 @@
+# Recycles the objects of short lived cells (fire, smoke) so spawning one
+# doesn't allocate and removing one doesn't leave garbage behind
+# Removed cells are only handed out again after collect() (called once per
+# tick), so a cell removed during a tick can't come back to life in a list
+# that is still being looped over
+class CellPool:
+    def __init__(self) -> None:
+        self.free = []  # Objects ready to be reused
+        self.released = []  # Objects removed since the last collect
+        self.live = 0
+        self.peak = 0
+
+    # Gets an object for a new cell of the class
+    def take(self, cell_class):
+        self.live += 1
+        if self.live > self.peak:
+            self.peak = self.live
+        if self.free:
+            return self.free.pop()
+        return object.__new__(cell_class)
+
+    # Gives back the object of a removed cell
+    def give(self, cell) -> None:
+        self.live -= 1
+        self.released.append(cell)
+
+    # Makes the released objects available again
+    def collect(self) -> None:
+        self.free.extend(self.released)
+        self.released.clear()
+
+    # Forgets the live cells (when the world is cleared)
+    def reset(self) -> None:
+        self.collect()
+        self.live = 0
+        self.peak = 0
+
+    def stats(self) -> dict:
+        return {
+            "live": self.live,
+            "pooled": len(self.free) + len(self.released),
+            "peak": self.peak,
+        }
@@ -0,0 +1,273 @@
+"""
+Recording and playback of simulation runs.
+
+A recording stores the material at every cell for every tick:
+
+    8 bytes   magic (b"SIMREC01")
+    8 bytes   header length (little endian)
+    header    UTF-8 JSON with the materials and the keyframe interval
+    frames    one after the other, each one being
+                1 byte    kind (b"K" keyframe, b"D" delta)
+                4 bytes   payload length (little endian)
+                payload   zlib compressed
+
+A keyframe payload is the width and height (2 bytes each) and then the whole
+grid, one byte per cell (0 = empty, otherwise the index in MATERIALS + 1).
+A delta payload has the runs of cells that changed since the previous frame
+(in the flattened grid): the number of runs (4 bytes), their starts and
+lengths (4 bytes each) and then the new values of the changed cells. A frame
+where nothing changed is a delta with no runs, so still scenes stay small.
+
+Play a recording with
+
+    python recorder.py run.rec
+
+(space pauses, left and right step, home goes back to the start) or export it
+to images with
+
+    python recorder.py run.rec --export frames
+"""
+
+import argparse, json, mmap, os, zlib
+import numpy as np
+from cell import MATERIALS, REGISTRY, store
+
+
+MAGIC = b"SIMREC01"
+KEYFRAME_INTERVAL = 300  # Ticks between keyframes (how far back a seek replays)
+LEVEL = 1  # zlib level, fast since this runs every tick
+
+# Color of each material in exported and played back frames (index 0 = empty)
+PALETTE = np.array(
+    [(0, 0, 0)] + [material.color for material in REGISTRY.values()], dtype=np.uint8
+)
+
+
+# Gets the material at every position of the grid (0 = empty, otherwise the
+# index in MATERIALS + 1), for the cells and the engine's particles
+def material_grid(shape: tuple[int, int], engine=None):
+    materials = np.zeros(shape, dtype=np.uint8)
+    count = store.count
+    xs, ys = store.x[:count], store.y[:count]
+    materials[xs, ys] = store.material[:count] + 1
+    if engine is not None:
+        for material in REGISTRY.values():
+            if material.particle is not None:
+                materials[engine.kind == material.particle] = material.id + 1
+    return materials
+
+
+# Gets the runs of True in a flat mask as (starts, lengths)
+def _runs(mask):
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+    return starts, stops - starts
+
+
+# Streams material grids to a file, one frame per record() call
+class Recorder:
+    def __init__(self, path, keyframe_interval: int = KEYFRAME_INTERVAL) -> None:
+        self.file = open(path, "wb")
+        self.keyframe_interval = keyframe_interval
+        self.previous = None  # Last recorded grid
+        self.frames = 0
+        self.since_keyframe = 0
+        header = json.dumps(
+            {"materials": MATERIALS, "keyframe_interval": keyframe_interval}
+        ).encode()
+        self.file.write(MAGIC)
+        self.file.write(len(header).to_bytes(8, "little"))
+        self.file.write(header)
+
+    def record(self, materials) -> None:
+        previous = self.previous
+        if (
+            previous is None
+            or previous.shape != materials.shape
+            or self.since_keyframe >= self.keyframe_interval
+        ):
+            width, height = materials.shape
+            payload = (
+                width.to_bytes(2, "little")
+                + height.to_bytes(2, "little")
+                + materials.tobytes()
+            )
+            self._write(b"K", payload)
+            self.previous = materials.copy()
+            self.since_keyframe = 1
+        else:
+            changed = (materials != previous).ravel()
+            starts, lengths = _runs(changed)
+            values = materials.ravel()[changed]
+            payload = (
+                len(starts).to_bytes(4, "little")
+                + starts.astype("<u4").tobytes()
+                + lengths.astype("<u4").tobytes()
+                + values.tobytes()
+            )
+            self._write(b"D", payload)
+            np.copyto(previous, materials)
+            self.since_keyframe += 1
+        self.frames += 1
+
+    def _write(self, kind: bytes, payload: bytes) -> None:
+        data = zlib.compress(payload, LEVEL)
+        self.file.write(kind + len(data).to_bytes(4, "little") + data)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+# Reads a recording back, frame by frame or from any frame
+# Only the frame kinds and offsets are read up front, seeking decodes from the
+# keyframe before the frame
+class Player:
+    def __init__(self, path) -> None:
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a recording")
+        length = int.from_bytes(data[len(MAGIC) : len(MAGIC) + 8], "little")
+        start = len(MAGIC) + 8
+        self.header = json.loads(data[start : start + length])
+        self.data = data
+        self.offsets = []  # Where each frame's payload starts
+        self.lengths = []
+        self.is_keyframe = []
+        self.keyframes = []  # Numbers of the keyframes
+        offset = start + length
+        while offset + 5 <= len(data):
+            size = int.from_bytes(data[offset + 1 : offset + 5], "little")
+            if offset + 5 + size > len(data):
+                break  # Cut off while it was being written
+            is_keyframe = data[offset : offset + 1] == b"K"
+            if is_keyframe:
+                self.keyframes.append(len(self.offsets))
+            self.is_keyframe.append(is_keyframe)
+            self.offsets.append(offset + 5)
+            self.lengths.append(size)
+            offset += 5 + size
+        if not self.keyframes or self.keyframes[0] != 0:
+            raise ValueError(f"{path} doesn't start with a keyframe")
+        self.position = -1  # Frame in self.grid
+        self.grid = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    # Gets the material grid of a frame (the array is reused, copy it to keep it)
+    def seek(self, frame: int):
+        if not 0 <= frame < len(self):
+            raise IndexError(f"frame {frame} out of range")
+        if frame == self.position:
+            return self.grid
+        keyframe = self.keyframes[np.searchsorted(self.keyframes, frame, side="right") - 1]
+        # Going forward from where it is saves decoding the keyframe again
+        first = self.position + 1 if keyframe <= self.position < frame else keyframe
+        for number in range(first, frame + 1):
+            self._apply(number)
+        return self.grid
+
+    def frames(self, start: int = 0, stop=None):
+        for number in range(start, len(self) if stop is None else stop):
+            yield self.seek(number)
+
+    def _apply(self, number: int) -> None:
+        offset = self.offsets[number]
+        payload = zlib.decompress(self.data[offset : offset + self.lengths[number]])
+        if self.is_keyframe[number]:
+            width = int.from_bytes(payload[:2], "little")
+            height = int.from_bytes(payload[2:4], "little")
+            self.grid = np.frombuffer(payload, np.uint8, offset=4).reshape(width, height).copy()
+        else:
+            runs = int.from_bytes(payload[:4], "little")
+            starts = np.frombuffer(payload, "<u4", runs, 4).astype(np.intp)
+            lengths = np.frombuffer(payload, "<u4", runs, 4 + 4 * runs).astype(np.intp)
+            values = np.frombuffer(payload, np.uint8, offset=4 + 8 * runs)
+            # Every changed index, run by run, in the same order as the values
+            ends = np.cumsum(lengths)
+            indices = np.arange(int(ends[-1]) if runs else 0) + np.repeat(
+                starts - (ends - lengths), lengths
+            )
+            self.grid.ravel()[indices] = values
+        self.position = number
+
+
+# Gets the RGB colors of a material grid
+def colors(materials):
+    return PALETTE[materials]
+
+
+# Saves frames of a recording as PNG images into a directory
+def export(player: Player, directory, cell_size: int = 1, start: int = 0, stop=None) -> int:
+    import pygame
+
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for number, materials in enumerate(player.frames(start, stop), start):
+        surface = pygame.surfarray.make_surface(colors(materials))
+        if cell_size != 1:
+            surface = pygame.transform.scale(
+                surface, (materials.shape[0] * cell_size, materials.shape[1] * cell_size)
+            )
+        pygame.image.save(surface, os.path.join(directory, f"frame_{number:06d}.png"))
+        count += 1
+    return count
+
+
+# Shows a recording in a window
+def play(player: Player, cell_size: int, fps: int) -> None:
+    import pygame
+
+    pygame.init()
+    width, height = player.seek(0).shape
+    screen = pygame.display.set_mode((width * cell_size, height * cell_size))
+    clock = pygame.time.Clock()
+    frame = 0
+    paused = False
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_LEFT:
+                    frame, paused = max(0, frame - 1), True
+                elif event.key == pygame.K_RIGHT:
+                    frame, paused = min(len(player) - 1, frame + 1), True
+                elif event.key == pygame.K_HOME:
+                    frame = 0
+
+        materials = player.seek(frame)
+        surface = pygame.surfarray.make_surface(colors(materials))
+        pygame.transform.scale(surface, screen.get_size(), screen)
+        pygame.display.set_caption(f"frame {frame + 1}/{len(player)}")
+        pygame.display.flip()
+        if not paused and frame < len(player) - 1:
+            frame += 1
+        clock.tick(fps)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Play or export a recording.")
+    parser.add_argument("path")
+    parser.add_argument("--export", metavar="DIR", help="save the frames as PNG files")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int)
+    parser.add_argument("--cell-size", type=int, default=4)
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args()
+
+    player = Player(args.path)
+    if args.export:
+        count = export(player, args.export, args.cell_size, args.start, args.stop)
+        print(f"exported {count} frames to {args.export}")
+    else:
+        play(player, args.cell_size, args.fps)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,127 @@
+import pygame
+import numpy as np
+from cell import store
+
+
+# Draws every cell with its own pygame.draw.rect call
+def draw_cells(screen, cells, cell_size, engine=None) -> None:
+    for celltype in cells:
+        for cell in cells[celltype]:
+            cell.draw(screen, cell_size)
+    if engine is not None:
+        engine.draw(screen, cell_size)
+
+
+# Draws the grid (or the part of it the camera sees) at once
+# Colors are written into a one pixel per cell RGB array, pushed to a small
+# surface in one call and then scaled up by the cell size
+class SurfaceRenderer:
+    def __init__(self, grid_shape: tuple[int, int], cell_size: int, chunks=None) -> None:
+        self.shape = grid_shape
+        self.cell_size = cell_size
+        # Made on the first paint and draw, so running without a window doesn't
+        # pay for them
+        self.rgb = None
+        self.window = None  # (x, y) slices of the area in the RGB array
+        self.surface = None
+        self.scaled = None
+        self.zoom = None  # Cell size the scaled surface was made with
+        # With chunks, only chunks that changed since the last frame are repainted
+        self.chunks = chunks
+
+    # Fills the RGB array from the cell store (and the array engine) for the
+    # (x, y) slices of the window, or for the whole grid
+    def paint(self, engine=None, window=None):
+        if window is None:
+            window = (slice(0, self.shape[0]), slice(0, self.shape[1]))
+        mask = None
+        if window != self.window:
+            # A different area is painted from scratch
+            self.window = window
+            self.rgb = np.zeros(
+                (window[0].stop - window[0].start, window[1].stop - window[1].start, 3),
+                dtype=np.uint8,
+            )
+        elif self.chunks is None:
+            self.rgb[:] = 0
+        else:
+            mask = self.chunks.cell_mask(self.chunks.dirty, window)
+            self.rgb[mask] = 0
+        if self.chunks is not None:
+            self.chunks.dirty[:] = False
+        rgb = self.rgb
+
+        count = store.count
+        xs = store.x[:count] - window[0].start
+        ys = store.y[:count] - window[1].start
+        colors = store.color[:count]
+        # Every cell is in the grid, but a camera window can leave some out
+        if rgb.shape[:2] != self.shape:
+            seen = (xs >= 0) & (xs < rgb.shape[0]) & (ys >= 0) & (ys < rgb.shape[1])
+            xs, ys, colors = xs[seen], ys[seen], colors[seen]
+        if mask is not None:
+            painted = mask[xs, ys]
+            xs, ys, colors = xs[painted], ys[painted], colors[painted]
+        rgb[xs, ys] = colors
+
+        if engine is not None:
+            engine.paint(rgb, mask, window)
+        return rgb
+
+    # Draws what the camera sees, or the whole grid at the cell size without one
+    def draw(self, screen, engine=None, camera=None) -> None:
+        if camera is None:
+            window, zoom, corner = None, self.cell_size, (0, 0)
+        else:
+            window, zoom = camera.window(), camera.zoom
+            corner = camera.to_screen(window[0].start, window[1].start)
+        moved = self.surface is None or zoom != self.zoom or (
+            window is not None and window != self.window
+        )
+        # Nothing changed, the last scaled frame is still good
+        if moved or self.chunks is None or self.chunks.dirty.any():
+            rgb = self.paint(engine, window)
+            self.surface, self.scaled = _scale(rgb, zoom, self.surface, self.scaled)
+            self.zoom = zoom
+        _show(screen, self.scaled, corner)
+
+
+# Draws the frames published by the simulation thread
+# Frames are already painted, so this only pushes new ones to the screen
+class FrameView:
+    def __init__(self) -> None:
+        self.surface = None
+        self.scaled = None
+        self.number = None  # Number of the frame on the scaled surface
+        self.zoom = None
+
+    def draw(self, screen, frame, camera) -> None:
+        if frame.number != self.number or camera.zoom != self.zoom:
+            self.surface, self.scaled = _scale(
+                frame.rgb, camera.zoom, self.surface, self.scaled
+            )
+            self.number = frame.number
+            self.zoom = camera.zoom
+        _show(screen, self.scaled, camera.to_screen(*frame.origin))
+
+
+# Pushes the RGB array to a surface and scales it up by the zoom
+# The surfaces are reused when they're the right size, returns both of them
+def _scale(rgb, zoom: int, surface=None, scaled=None):
+    size = rgb.shape[:2]
+    if surface is None or surface.get_size() != size:
+        surface = pygame.Surface(size)
+    scaled_size = (size[0] * zoom, size[1] * zoom)
+    if scaled is None or scaled.get_size() != scaled_size:
+        scaled = pygame.Surface(scaled_size)
+    pygame.surfarray.blit_array(surface, rgb)
+    pygame.transform.scale(surface, scaled_size, scaled)
+    return surface, scaled
+
+
+# Blits the scaled surface with its top left corner at the position, clearing
+# whatever part of the screen it doesn't cover
+def _show(screen, scaled, corner) -> None:
+    if not scaled.get_rect(topleft=corner).contains(screen.get_rect()):
+        screen.fill((0, 0, 0))
+    screen.blit(scaled, corner)
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+SPARE_SIZE = 1024  # Draws made at a time for single draws
+
+
+# Random numbers for the cell rules, drawn in bulk from one seeded NumPy
+# generator so a run can be repeated from its seed
+# Before a group of cells is updated, deal() draws an array per stream with one
+# number for each cell, and a cell reads its own with .item(turn) (turn is set
+# by the update loop). Each cell class lists the streams its rule reads in draws
+# random(), side() and randrange() are for draws outside the update loop, like
+# a new cell's color, and come from a spare list that is refilled when used up
+# The array engines draw from the generator itself
+class RandomPool:
+    # How each stream is drawn
+    STREAMS = {
+        "uniform": lambda generator, count: generator.random(count),
+        "again": lambda generator, count: generator.random(count),  # A second uniform
+        "coin": lambda generator, count: generator.integers(0, 2, count, dtype=np.int8),
+        "normal": lambda generator, count: generator.standard_normal(count),
+    }
+
+    def __init__(self, seed=None) -> None:
+        self.seed(seed)
+
+    # Starts over from the seed (None for a fresh one)
+    def seed(self, seed=None) -> None:
+        self.generator = np.random.default_rng(seed)
+        self.turn = 0
+        for name in self.STREAMS:
+            setattr(self, name, np.zeros(0))
+        self.spare = []
+
+    # Draws the streams for a group of count cells
+    def deal(self, count: int, draws) -> None:
+        for name in draws:
+            setattr(self, name, self.STREAMS[name](self.generator, count))
+
+    # Gets a uniform number in [0, 1)
+    def random(self) -> float:
+        if not self.spare:
+            self.spare = self.generator.random(SPARE_SIZE).tolist()
+        return self.spare.pop()
+
+    # Gets 0 or 1
+    def side(self) -> int:
+        return int(self.random() < 0.5)
+
+    # Gets an integer in [start, stop)
+    def randrange(self, start: int, stop: int) -> int:
+        return start + int(self.random() * (stop - start))
+
+    # What's needed to carry on with the same numbers (the streams are dealt
+    # again before they're read)
+    def state(self) -> dict:
+        return {"generator": self.generator.bit_generator.state, "spare": self.spare}
+
+    def set_state(self, state: dict) -> None:
+        self.generator.bit_generator.state = state["generator"]
+        self.spare = list(state["spare"])
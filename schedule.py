@@ -0,0 +1,54 @@
+import numpy as np
+
+
+# Decides which materials update on each tick
+# Every material has an update period (it gets a turn every period ticks) and
+# a phase (which tick of the period its turn is on). The materials are visited
+# in a fixed bottom-up order: the ones that fall, then the ones that rise
+# A material sitting out a tick costs nothing but folding the chunks awake on
+# that tick into its own mask. On its turn it runs in every chunk that was
+# awake since its last one, so its cells don't fall asleep in between
+class Scheduler:
+    def __init__(self, order: list[str], materials: dict) -> None:
+        self.order = order
+        self.materials = materials  # Material of each name (see materials.py)
+        self.missed = {}  # Chunks awake since the last turn of each material
+
+    # Forgets the missed chunks (when the world is replaced)
+    def reset(self) -> None:
+        self.missed.clear()
+
+    # Whether the material has a turn on the tick
+    def is_due(self, material: str, tick: int) -> bool:
+        period = self.materials[material].period
+        return period <= 1 or tick % period == self.materials[material].phase % period
+
+    # Gets the (material, chunk mask) of each material due on the chunks' tick,
+    # in update order
+    def due(self, chunks) -> list:
+        turns = []
+        for material in self.order:
+            missed = self.missed.get(material)
+            if not self.is_due(material, chunks.ticks):
+                if missed is None:
+                    self.missed[material] = chunks.awake.copy()
+                else:
+                    missed |= chunks.awake
+                continue
+            if missed is None:
+                turns.append((material, chunks.awake))
+            else:
+                missed |= chunks.awake
+                turns.append((material, self.missed.pop(material)))
+        return turns
+
+    # Gets the missed chunks as arrays to save, and puts them back
+    def state(self) -> dict:
+        return {"missed_" + material: mask for material, mask in self.missed.items()}
+
+    def set_state(self, arrays: dict) -> None:
+        self.missed = {
+            material: np.array(arrays["missed_" + material], dtype=bool)
+            for material in self.order
+            if "missed_" + material in arrays
+        }
@@ -0,0 +1,82 @@
+"""
+Binary world snapshots.
+
+A snapshot file is:
+
+    8 bytes   magic (b"SIMSNAP1")
+    8 bytes   header length (little endian)
+    header    UTF-8 JSON with the format version, the metadata and where
+              each array is
+    arrays    raw array data, each one starting on a 64 byte boundary
+
+Arrays are read back through a memory map, so opening a snapshot doesn't
+parse or copy anything until the data is actually used. Snapshots of another
+format version are refused rather than read wrong.
+"""
+
+import json, mmap
+import numpy as np
+
+
+MAGIC = b"SIMSNAP1"
+VERSION = 1  # Goes up whenever what a snapshot holds changes
+ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# Writes the metadata (anything JSON can hold) and the named arrays to the file
+def write(path, metadata: dict, arrays: dict) -> None:
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({"version": VERSION, "metadata": metadata, "arrays": layout}).encode()
+    start = _align(len(MAGIC) + 8 + len(header))
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        file.write(len(header).to_bytes(8, "little"))
+        file.write(header)
+        for name, array in arrays.items():
+            file.seek(start + layout[name]["offset"])
+            file.write(array.data)
+        # Make sure the file covers the padding after the last array
+        file.truncate(start + offset)
+
+
+# Reads a snapshot, the arrays are read only views into a memory map of the file
+def read(path) -> tuple[dict, dict]:
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        length = int.from_bytes(file.read(8), "little")
+        header = json.loads(file.read(length))
+        if header.get("version") != VERSION:
+            raise ValueError(
+                f"{path} is a version {header.get('version', 0)} snapshot,"
+                f" only version {VERSION} can be loaded"
+            )
+        start = _align(len(MAGIC) + 8 + length)
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    arrays = {}
+    for name, info in header["arrays"].items():
+        dtype = np.dtype(info["dtype"])
+        shape = tuple(info["shape"])
+        count = int(np.prod(shape))
+        if count == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+            continue
+        arrays[name] = np.frombuffer(
+            data, dtype=dtype, count=count, offset=start + info["offset"]
+        ).reshape(shape)
+    return header["metadata"], arrays
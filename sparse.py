@@ -0,0 +1,317 @@
+import numpy as np
+
+
+CHUNK_BITS = 4  # Chunks are 2 ** CHUNK_BITS cells on each side
+CHUNK_SIZE = 1 << CHUNK_BITS
+CHUNK_MASK = CHUNK_SIZE - 1
+
+
+# The chunks of a ChunkedArray, shared with the windows into it
+# Each chunk is an index into a pool of blocks. Block 0 is all fill and is
+# never written, so a chunk with nothing in it costs just its table entry
+class _Chunks:
+    def __init__(self, shape: tuple[int, int], dtype, fill) -> None:
+        self.table = np.zeros(
+            (-(-shape[0] // CHUNK_SIZE), -(-shape[1] // CHUNK_SIZE)), dtype=np.int32
+        )
+        self.blocks = np.full((1, CHUNK_SIZE, CHUNK_SIZE), fill, dtype=dtype)
+        self.used = 1  # Blocks handed out so far (including block 0)
+        self.free = []  # Blocks given back by release() or clear()
+        self.fill = fill
+
+    # Gives the chunk a block of its own (all fill) and returns it
+    def allocate(self, cx: int, cy: int) -> int:
+        if self.free:
+            block = self.free.pop()
+        else:
+            if self.used == len(self.blocks):
+                grown = np.empty(
+                    (self.used * 2, CHUNK_SIZE, CHUNK_SIZE), dtype=self.blocks.dtype
+                )
+                grown[: self.used] = self.blocks
+                self.blocks = grown
+            block = self.used
+            self.used += 1
+        self.blocks[block] = self.fill
+        self.table[cx, cy] = block
+        return block
+
+
+# Column of a ChunkedArray, so a[x][y] works like it does for lists of lists
+class _Column:
+    __slots__ = ("array", "x")
+
+    def __init__(self, array, x: int) -> None:
+        self.array = array
+        self.x = x
+
+    def __getitem__(self, y):
+        return self.array[self.x, y]
+
+    def __setitem__(self, y, value) -> None:
+        array = self.array
+        if isinstance(y, slice):
+            x = self.x + array.x0
+            start, stop, _ = y.indices(array.shape[1])
+            start += array.y0
+            stop += array.y0
+            chunks = array.chunks
+            block = chunks.table.item(x >> CHUNK_BITS, start >> CHUNK_BITS)
+            # Short runs like the ones _touch writes are mostly inside one chunk
+            if block and start >> CHUNK_BITS == (stop - 1) >> CHUNK_BITS and y.step is None:
+                top = start & CHUNK_MASK
+                chunks.blocks[block, x & CHUNK_MASK, top : top + stop - start] = value
+                return
+            positions = range(*y.indices(array.shape[1]))
+            for position, item in zip(positions, np.broadcast_to(value, len(positions)).tolist()):
+                array._set(x, position + array.y0, item)
+        else:
+            array[self.x, y] = value
+
+
+# 2D array stored as fixed size chunks that are only allocated once something
+# other than the fill value is written to them, so a big world costs memory for
+# the area that is in use rather than for its size
+# Indexing works like it does on the dense arrays it stands in for: a[x, y]
+# and a.item(x, y) for one position, slices for a (copied) dense area, index
+# arrays for positions all at once and np.asarray(a) for the whole thing
+class ChunkedArray:
+    def __init__(self, shape: tuple[int, int], dtype, fill=0, chunks=None, origin=(0, 0)):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.fill = fill
+        self.chunks = _Chunks(shape, dtype, fill) if chunks is None else chunks
+        self.x0, self.y0 = origin
+
+    # Gets a window of the array at the offset (sharing its chunks)
+    def window(self, x: int, y: int, shape: tuple[int, int]) -> "ChunkedArray":
+        return ChunkedArray(
+            shape, self.dtype, self.fill, self.chunks, (self.x0 + x, self.y0 + y)
+        )
+
+    def item(self, x: int, y: int):
+        x += self.x0
+        y += self.y0
+        chunks = self.chunks
+        return chunks.blocks.item(
+            chunks.table.item(x >> CHUNK_BITS, y >> CHUNK_BITS),
+            x & CHUNK_MASK,
+            y & CHUNK_MASK,
+        )
+
+    def __getitem__(self, key):
+        # One position is by far the most common, so it's checked first
+        if type(key) is tuple:
+            x, y = key
+            if type(x) is int and type(y) is int:
+                x += self.x0
+                y += self.y0
+                chunks = self.chunks
+                return chunks.blocks.item(
+                    chunks.table.item(x >> CHUNK_BITS, y >> CHUNK_BITS),
+                    x & CHUNK_MASK,
+                    y & CHUNK_MASK,
+                )
+        elif isinstance(key, (int, np.integer)):
+            return _Column(self, int(key))
+        return self._get(key)
+
+    def _get(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        x, y = key
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            return self.item(int(x), int(y))
+        if isinstance(x, (int, np.integer, slice)) and isinstance(
+            y, (int, np.integer, slice)
+        ):
+            area = self._read(self._range(x, 0), self._range(y, 1))
+            # Integer indexes drop their axis, like they do in NumPy
+            return area[tuple(slice(None) if isinstance(k, slice) else 0 for k in key)]
+        xs, ys = np.broadcast_arrays(self._positions(x, 0), self._positions(y, 1))
+        chunks = self.chunks
+        xs = xs + self.x0
+        ys = ys + self.y0
+        blocks = chunks.table[xs >> CHUNK_BITS, ys >> CHUNK_BITS]
+        return chunks.blocks[blocks, xs & CHUNK_MASK, ys & CHUNK_MASK]
+
+    def __setitem__(self, key, value) -> None:
+        if type(key) is tuple:
+            x, y = key
+            if type(x) is int and type(y) is int:
+                self._set(x + self.x0, y + self.y0, value)
+                return
+        self._put(key, value)
+
+    def _put(self, key, value) -> None:
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        x, y = key
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            self._set(int(x) + self.x0, int(y) + self.y0, value)
+        elif isinstance(x, (int, np.integer, slice)) and isinstance(
+            y, (int, np.integer, slice)
+        ):
+            xs, ys = self._range(x, 0), self._range(y, 1)
+            # The value has the shape of what the index gets
+            shape = tuple(len(r) for k, r in ((x, xs), (y, ys)) if isinstance(k, slice))
+            values = np.broadcast_to(np.asarray(value, dtype=self.dtype), shape)
+            self._write(xs, ys, values.reshape(len(xs), len(ys)))
+        else:
+            xs, ys = np.broadcast_arrays(self._positions(x, 0), self._positions(y, 1))
+            values = np.broadcast_to(np.asarray(value, dtype=self.dtype), xs.shape).ravel()
+            xs = xs.ravel() + self.x0
+            ys = ys.ravel() + self.y0
+            chunks = self.chunks
+            # Chunks only need a block for the values that aren't fill
+            needed = values != self.fill
+            cxs = (xs[needed] >> CHUNK_BITS).tolist()
+            cys = (ys[needed] >> CHUNK_BITS).tolist()
+            for cx, cy in set(zip(cxs, cys)):
+                if chunks.table.item(cx, cy) == 0:
+                    chunks.allocate(cx, cy)
+            blocks = chunks.table[xs >> CHUNK_BITS, ys >> CHUNK_BITS]
+            written = blocks != 0
+            chunks.blocks[
+                blocks[written], xs[written] & CHUNK_MASK, ys[written] & CHUNK_MASK
+            ] = values[written]
+
+    def __array__(self, dtype=None, copy=None):
+        area = self._read(range(self.shape[0]), range(self.shape[1]))
+        return area if dtype is None else area.astype(dtype)
+
+    # Frees the blocks of chunks that are back to all fill
+    def release(self) -> None:
+        chunks = self.chunks
+        cx, cy = np.nonzero(chunks.table)
+        blocks = chunks.table[cx, cy]
+        empty = (chunks.blocks[blocks] == self.fill).all(axis=(1, 2))
+        chunks.table[cx[empty], cy[empty]] = 0
+        chunks.free.extend(blocks[empty].tolist())
+
+    # Sets everything back to fill, freeing every block
+    def clear(self) -> None:
+        chunks = self.chunks
+        chunks.table[:] = 0
+        chunks.free = list(range(1, chunks.used))
+
+    # Gets the chunks that have a block, as arrays to save: the (cx, cy) of
+    # each and their blocks in the same order. They're the whole array's, a
+    # window gets the chunks of the array it's in
+    def state(self) -> tuple:
+        table = self.chunks.table
+        cx, cy = np.nonzero(table)
+        return np.stack((cx, cy), axis=1), self.chunks.blocks[table[cx, cy]]
+
+    # Puts back the chunks from state(), dropping every other block
+    def set_state(self, positions, blocks) -> None:
+        chunks = self.chunks
+        chunks.blocks = np.empty((len(blocks) + 1, CHUNK_SIZE, CHUNK_SIZE), dtype=self.dtype)
+        chunks.blocks[0] = self.fill
+        chunks.blocks[1:] = blocks
+        chunks.table[:] = 0
+        chunks.table[positions[:, 0], positions[:, 1]] = np.arange(1, len(blocks) + 1)
+        chunks.used = len(blocks) + 1
+        chunks.free = []
+
+    # Number of chunks that have a block
+    def occupied(self) -> int:
+        return int(np.count_nonzero(self.chunks.table))
+
+    # Gets the area (x0, x1, y0, y1) covering every chunk that has a block,
+    # None when none has
+    def bounds(self):
+        cx, cy = np.nonzero(self.chunks.table)
+        if len(cx) == 0:
+            return None
+        x0 = max(0, int(cx.min()) * CHUNK_SIZE - self.x0)
+        x1 = min(self.shape[0], (int(cx.max()) + 1) * CHUNK_SIZE - self.x0)
+        y0 = max(0, int(cy.min()) * CHUNK_SIZE - self.y0)
+        y1 = min(self.shape[1], (int(cy.max()) + 1) * CHUNK_SIZE - self.y0)
+        return (x0, x1, y0, y1) if x0 < x1 and y0 < y1 else None
+
+    @property
+    def nbytes(self) -> int:
+        chunks = self.chunks
+        return chunks.table.nbytes + chunks.blocks.nbytes
+
+    def _set(self, x: int, y: int, value) -> None:
+        chunks = self.chunks
+        cx, cy = x >> CHUNK_BITS, y >> CHUNK_BITS
+        block = chunks.table.item(cx, cy)
+        if block == 0:
+            if value == self.fill:
+                return
+            block = chunks.allocate(cx, cy)
+        chunks.blocks[block, x & CHUNK_MASK, y & CHUNK_MASK] = value
+
+    # Gets the positions an integer or slice index covers along an axis
+    def _range(self, key, axis: int) -> range:
+        if isinstance(key, slice):
+            return range(*key.indices(self.shape[axis]))
+        key = int(key)
+        if not -self.shape[axis] <= key < self.shape[axis]:
+            raise IndexError(f"index {key} is out of bounds for axis {axis}")
+        return range(key % self.shape[axis], key % self.shape[axis] + 1)
+
+    def _positions(self, key, axis: int):
+        if isinstance(key, slice):
+            return np.arange(*key.indices(self.shape[axis])).reshape(
+                (-1, 1) if axis == 0 else (1, -1)
+            )
+        return np.asarray(key)
+
+    # Calls visit(cx, cy, block, slices inside the block, slices of the area)
+    # for every chunk the area (ranges of positions) overlaps
+    def _overlaps(self, xs: range, ys: range, visit) -> None:
+        if len(xs) == 0 or len(ys) == 0:
+            return
+        x0, x1 = xs.start + self.x0, xs.stop + self.x0
+        y0, y1 = ys.start + self.y0, ys.stop + self.y0
+        table = self.chunks.table
+        for cx in range(x0 >> CHUNK_BITS, ((x1 - 1) >> CHUNK_BITS) + 1):
+            left = max(x0, cx << CHUNK_BITS)
+            right = min(x1, (cx + 1) << CHUNK_BITS)
+            for cy in range(y0 >> CHUNK_BITS, ((y1 - 1) >> CHUNK_BITS) + 1):
+                top = max(y0, cy << CHUNK_BITS)
+                bottom = min(y1, (cy + 1) << CHUNK_BITS)
+                inside = (
+                    slice(left & CHUNK_MASK, ((right - 1) & CHUNK_MASK) + 1),
+                    slice(top & CHUNK_MASK, ((bottom - 1) & CHUNK_MASK) + 1),
+                )
+                part = (slice(left - x0, right - x0), slice(top - y0, bottom - y0))
+                visit(cx, cy, table.item(cx, cy), inside, part)
+
+    def _read(self, xs: range, ys: range):
+        x0, x1 = xs.start + self.x0, xs.stop + self.x0
+        y0, y1 = ys.start + self.y0, ys.stop + self.y0
+        # Small areas (like the 3x3 around a cell) are mostly inside one chunk
+        cx, cy = x0 >> CHUNK_BITS, y0 >> CHUNK_BITS
+        if x1 > x0 and y1 > y0 and (x1 - 1) >> CHUNK_BITS == cx and (y1 - 1) >> CHUNK_BITS == cy:
+            block = self.chunks.table.item(cx, cy)
+            left, top = x0 & CHUNK_MASK, y0 & CHUNK_MASK
+            return self.chunks.blocks[
+                block, left : left + x1 - x0, top : top + y1 - y0
+            ].copy()
+        area = np.full((len(xs), len(ys)), self.fill, dtype=self.dtype)
+        blocks = self.chunks.blocks
+
+        def visit(cx, cy, block, inside, part) -> None:
+            if block:
+                area[part] = blocks[(block,) + inside]
+
+        self._overlaps(xs, ys, visit)
+        return area
+
+    def _write(self, xs: range, ys: range, values) -> None:
+        chunks = self.chunks
+
+        def visit(cx, cy, block, inside, part) -> None:
+            part = values[part]
+            if block == 0:
+                if (part == self.fill).all():
+                    return
+                block = chunks.allocate(cx, cy)
+            chunks.blocks[(block,) + inside] = part
+
+        self._overlaps(xs, ys, visit)
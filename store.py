@@ -0,0 +1,83 @@
+import numpy as np
+
+
+# One typed array per cell attribute
+FIELDS = {
+    "x": np.int32,
+    "y": np.int32,
+    "material": np.int8,
+    "lifetime": np.int32,
+    "direction": np.int8,
+    "chance": np.float32,  # Sand: chance to fall to the side
+    "variation": np.int16,  # Smoke: color variation
+    "cling_factor": np.float32,  # Fire: chance to stick to what it burns
+    "color": np.uint8,
+    "index": np.int32,  # Position in its cell list
+}
+
+
+# Struct of arrays storage for every cell in the simulation
+# Cells live in slots 0..count-1 and are removed by moving the last cell into
+# the freed slot, so adding and removing are both O(1). Slots past count are
+# kept zeroed, so a new cell starts out with every attribute 0
+class CellStore:
+    def __init__(self, capacity: int = 1024) -> None:
+        self.capacity = capacity
+        self.count = 0
+        self.views = []  # The Cell object viewing each slot
+        for name, dtype in FIELDS.items():
+            shape = (capacity, 3) if name == "color" else capacity
+            setattr(self, name, np.zeros(shape, dtype=dtype))
+
+    # Gets a slot for the view, growing the arrays if needed
+    def add(self, view, material: int) -> int:
+        if self.count == self.capacity:
+            self._grow()
+        slot = self.count
+        self.material[slot] = material
+        self.views.append(view)
+        self.count += 1
+        return slot
+
+    # Frees the slot by moving the last cell into it
+    def remove(self, slot: int) -> None:
+        last = self.count - 1
+        for name in FIELDS:
+            array = getattr(self, name)
+            array[slot] = array[last]
+            array[last] = 0
+        if slot != last:
+            moved = self.views[last]
+            moved.slot = slot
+            self.views[slot] = moved
+        self.views.pop()
+        self.count -= 1
+
+    # Replaces the contents with the arrays (one per field) and their views
+    def load(self, arrays: dict, views: list) -> None:
+        self.clear()
+        count = len(views)
+        self.capacity = max(self.capacity, count)
+        for name, dtype in FIELDS.items():
+            shape = (self.capacity, 3) if name == "color" else self.capacity
+            array = np.zeros(shape, dtype=dtype)
+            array[:count] = arrays[name]
+            setattr(self, name, array)
+        self.views = views
+        self.count = count
+
+    def clear(self) -> None:
+        for view in self.views:
+            view.slot = -1
+        for name in FIELDS:
+            getattr(self, name)[: self.count] = 0
+        self.views.clear()
+        self.count = 0
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        for name in FIELDS:
+            array = getattr(self, name)
+            grown = np.zeros((self.capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[: self.count] = array[: self.count]
+            setattr(self, name, grown)
@@ -0,0 +1,20 @@
+import os, sys
+
+# No window is needed, the simulation runs headless
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import main
+
+
+# Engines (and sparse or not) a world can run with
+ENGINES = [("objects", False), ("objects", True), ("numpy", False), ("parallel", False)]
+
+
+# Puts back a small plain world after each test, which also stops the
+# parallel engine's workers
+@pytest.fixture(autouse=True)
+def fresh_world():
+    yield
+    main.new_world(8, 8, "objects", 0)
@@ -0,0 +1,16 @@
+import pytest
+import main, bench
+from cell import validate
+from conftest import ENGINES
+
+
+# The grid, the owners and the cells still agree after running every bench
+# scenario on every engine
+@pytest.mark.parametrize("scenario", list(bench.SCENARIOS))
+@pytest.mark.parametrize("sim_engine, sparse", ENGINES)
+def test_scenario_stays_valid(scenario, sim_engine, sparse):
+    main.new_world(64, 48, sim_engine, 0, sparse)
+    bench.SCENARIOS[scenario](64, 48)
+    for _ in range(50):
+        main.tick()
+        validate(main.grid)
@@ -0,0 +1,32 @@
+import numpy as np
+import main
+from brush import Brush
+from cell import validate
+
+
+# A stroke steps one cell at a time along its longer side, so there are no
+# gaps however far the mouse moved between two events
+def test_stroke_has_no_gaps():
+    xs, ys = Brush(0).stroke((0, 0), (100, 3))
+    assert xs.tolist() == list(range(101))
+    assert ys[0] == 0 and ys[-1] == 3 and (np.diff(ys) >= 0).all() and (np.diff(ys) <= 1).all()
+    dx, dy = Brush(2, "circle").footprint()
+    assert len(dx) == 21 and (dx**2 + dy**2 <= 6.25).all()
+    assert len(Brush(2, "square").footprint()[0]) == 25
+
+
+# Painting a stroke fills the band it covers in one go and erasing it with a
+# bigger brush takes it all back out
+def test_paint_and_erase_a_stroke():
+    main.new_world(64, 48, "objects", 0)
+    brush = Brush(2, "square")
+    main.place_cells("wood", *brush.stroke((5, 10), (50, 30)))
+    validate(main.grid)
+    for x, y in zip(*Brush(0).stroke((5, 10), (50, 30))):
+        assert (np.asarray(main.grid[x - 2 : x + 3, y - 2 : y + 3]) == main.SOLID_LAYER).all()
+    assert main.material_counts()["wood"] == (np.asarray(main.grid) == main.SOLID_LAYER).sum()
+
+    main.erase_cells(*Brush(3, "square").stroke((5, 10), (50, 30)))
+    validate(main.grid)
+    assert main.material_counts()["wood"] == 0
+    assert (np.asarray(main.grid) == main.EMPTY_LAYER).all()
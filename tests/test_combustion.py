@@ -0,0 +1,28 @@
+import numpy as np
+import main, bench, cell, combustion, heat
+
+
+WOOD = main.REGISTRY["wood"].durability
+
+
+# Acid takes one health a tick off the wood under and beside it, and wood
+# that runs out turns to smoke. Hot wood loses one for each time over the
+# ignition temperature it is and burns down to fire
+def test_acid_and_heat_wear_wood_down():
+    main.new_world(32, 32, "objects", 0)
+    bench.fill("wood", 8, 20, 16, 22)
+    main.place_cell("acid", 10, 19)
+    main.place_cell("acid", 7, 21)
+    cell.temperature[13, 21] = heat.IGNITION_TEMPERATURE * 3
+    heat.reset(cell.temperature)
+    combustion.step(main.grid, main.cells)
+    health = np.asarray(cell.health)
+    assert health[10, 20] == WOOD - 1 and health[8, 21] == WOOD - 1
+    assert health[13, 21] == WOOD - 3
+    assert health[11, 20] == health[10, 21] == health[9, 20] == WOOD
+
+    for _ in range(WOOD - 1):
+        combustion.step(main.grid, main.cells)
+    assert main.grid[10, 20] == main.SMOKE_LAYER and cell.health[10, 20] == 0
+    assert main.grid[13, 21] == main.FIRE_LAYER
+    assert main.grid[11, 20] == main.SOLID_LAYER
@@ -0,0 +1,68 @@
+import main
+from governor import Governor
+
+
+def make_governor():
+    switched = []
+    levels = [(name, lambda on, name=name: switched.append((name, on))) for name in "abc"]
+    governor = Governor(10.0, levels)
+    governor.enabled = True
+    return governor, switched
+
+
+# Ticks over budget turn the levels on one at a time, every RAISE_AFTER ticks,
+# and ticks well under turn them back off last first every LOWER_AFTER ticks
+def test_raises_over_budget_and_lowers_under():
+    governor, switched = make_governor()
+    for _ in range(5):
+        governor.record(10.0)  # On budget is fine
+    assert governor.level == 0
+    for _ in range(200):
+        governor.record(30.0)
+    assert governor.active() == ["a", "b", "c"]
+    assert switched == [("a", True), ("b", True), ("c", True)]
+
+    switched.clear()
+    ticks = 0
+    while governor.level > 1:
+        governor.record(1.0)
+        ticks += 1
+    assert governor.active() == ["a"] and switched == [("c", False), ("b", False)]
+    assert ticks > 2 * Governor.LOWER_AFTER
+
+
+# A disabled governor ignores the ticks, reset puts back full detail
+def test_disabled_and_reset():
+    governor, switched = make_governor()
+    governor.enabled = False
+    for _ in range(100):
+        governor.record(30.0)
+    assert governor.level == 0 and not switched
+    governor.enabled = True
+    for _ in range(100):
+        governor.record(30.0)
+    governor.reset()
+    assert governor.level == 0 and switched[-3:] == [("c", False), ("b", False), ("a", False)]
+
+
+# Every level of the game's own gives up its detail and puts it back
+def test_game_levels_switch_back(monkeypatch):
+    main.new_world(32, 32, "objects", 0)
+    monkeypatch.setattr(main.chunks, "period", main.OFFSCREEN_PERIOD)
+
+    def detail():
+        return [
+            main.Water.shading,
+            main.REGISTRY["smoke"].period,
+            main.Smoke.aging,
+            main.Fire.aging,
+            main.chunks.period,
+        ]
+
+    before = detail()
+    for _, switch in main.LEVELS:
+        switch(True)
+    assert all(now != then for now, then in zip(detail(), before))
+    for _, switch in reversed(main.LEVELS):
+        switch(False)
+    assert detail() == before
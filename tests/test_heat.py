@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import main, bench, cell, heat
+
+
+# Off screen chunks frozen with --offscreen 0 keep their wood, fire and heat
+# as they are until the camera comes back to them
+def test_frozen_chunks_dont_burn(monkeypatch):
+    main.new_world(256, 96, "objects", 0)
+    bench.forest_fire(256, 96)
+    monkeypatch.setattr(main.chunks, "period", 0)
+    # The camera shows the first 108 columns, their chunks and the ones
+    # next to them run
+    frozen = slice(144, 256)
+    health = np.array(cell.health[frozen])
+    fires = np.asarray(main.grid[frozen]) == main.FIRE_LAYER
+    for _ in range(100):
+        main.tick()
+    assert np.array_equal(np.array(cell.health[frozen]), health)
+    assert np.array_equal(np.asarray(main.grid[frozen]) == main.FIRE_LAYER, fires)
+    assert not np.asarray(cell.temperature[frozen]).any()
+
+
+# A new world is all at air temperature, so nothing is looked at until there's
+# fire, a loaded one picks up where its heat is
+@pytest.mark.parametrize("sparse", [False, True])
+def test_hot_area_of_new_and_loaded_worlds(tmp_path, sparse):
+    main.new_world(64, 48, "objects", 0, sparse)
+    assert heat.hot is None
+    cell.temperature[10:20, 5:8] = 300
+    path = tmp_path / "hot.snap"
+    main.save_world(path)
+    main.load_world(path)
+    x0, x1, y0, y1 = heat.hot
+    assert x0 <= 10 and x1 >= 20 and y0 <= 5 and y1 >= 8
+    main.tick()
+    assert np.asarray(cell.temperature)[10:20, 5:8].all()
+
+
+# Fire heats the wood next to it past the ignition temperature, less the
+# further in it is, and the heat stays in the area around the fire
+def test_fire_heats_wood_next_to_it():
+    main.new_world(32, 32, "objects", 0)
+    bench.fill("wood", 10, 10, 20, 20)
+    main.place_cell("fire", 9, 15)
+    for _ in range(10):
+        heat.step(main.grid)
+    temperature = np.asarray(cell.temperature)
+    assert temperature[9, 15] == heat.FIRE_TEMPERATURE
+    assert temperature[10, 15] >= heat.IGNITION_TEMPERATURE
+    assert temperature[10, 15] > temperature[11, 15] > temperature[12, 15] > 0
+    x0, x1, y0, y1 = heat.hot
+    assert x1 < 20 and not temperature[x1:].any()
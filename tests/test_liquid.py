@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+import main, bench
+
+
+# A tall column of liquid poured into a wide tank spreads out flat within a
+# few dozen turns (moving one cell a turn it'd take hundreds), then sleeps.
+# Acid only gets a turn every period ticks
+@pytest.mark.parametrize("material", ["water", "acid"])
+def test_tank_levels_then_sleeps(material):
+    main.new_world(128, 48, "objects", 0)
+    bench.walls(128, 48)
+    bench.fill(material, 32, 0, 64, 24)
+    for _ in range(60 * main.REGISTRY[material].period):
+        main.tick()
+    depth = (np.asarray(main.grid)[1:-1] == main.WATER_LAYER).sum(axis=1)
+    assert depth.max() - depth.min() <= 1
+    assert not main.chunks.awake.any()
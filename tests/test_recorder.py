@@ -0,0 +1,26 @@
+import numpy as np
+import main, bench
+from recorder import Recorder, Player, material_grid
+
+
+# Every frame read back from a recording, in order or by seeking anywhere,
+# is the material grid that was recorded
+def test_seek_and_replay_give_the_recorded_frames(tmp_path):
+    main.new_world(64, 48, "objects", 0)
+    bench.forest_fire(64, 48)
+    path = tmp_path / "world.rec"
+    recorder = Recorder(path, keyframe_interval=16)
+    grids = []
+    for _ in range(100):
+        main.tick()
+        grids.append(material_grid(main.grid.shape, main.engine))
+        recorder.record(grids[-1])
+    recorder.close()
+
+    player = Player(path)
+    assert len(player) == len(grids)
+    assert player.keyframes == list(range(0, 100, 16))
+    for frame in [0, 5, 99, 48, 47, 15, 16, 17, 60, 3]:
+        assert np.array_equal(player.seek(frame), grids[frame]), frame
+    for frame, materials in enumerate(player.frames()):
+        assert np.array_equal(materials, grids[frame]), frame
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+import main, bench
+from conftest import ENGINES
+
+
+def run(sim_engine, sparse, seed):
+    main.new_world(64, 48, sim_engine, seed, sparse)
+    bench.forest_fire(64, 48)
+    bench.sand_avalanche(64, 48)
+    for _ in range(60):
+        main.tick()
+    return np.array(main.grid)
+
+
+# Worlds started from the same seed run the same, other seeds don't
+@pytest.mark.parametrize("sim_engine, sparse", ENGINES)
+def test_same_seed_runs_the_same(sim_engine, sparse):
+    first = run(sim_engine, sparse, 7)
+    assert np.array_equal(run(sim_engine, sparse, 7), first)
+    assert not np.array_equal(run(sim_engine, sparse, 8), first)
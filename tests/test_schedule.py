@@ -0,0 +1,47 @@
+import numpy as np
+from types import SimpleNamespace
+import main
+from schedule import Scheduler
+
+
+# A material with a period of 3 and a phase of 1 only gets the ticks 1, 4, 7,
+# ... and on each of them runs in every chunk that was awake since its last
+def test_slow_material_gets_the_missed_chunks():
+    materials = {
+        "sand": SimpleNamespace(period=1, phase=0),
+        "acid": SimpleNamespace(period=3, phase=1),
+    }
+    scheduler = Scheduler(["sand", "acid"], materials)
+    assert [tick for tick in range(9) if scheduler.is_due("acid", tick)] == [1, 4, 7]
+
+    chunks = SimpleNamespace(ticks=0, awake=np.zeros((4, 4), dtype=bool))
+    turns = []
+    for tick, chunk in zip(range(1, 6), [(0, 0), (1, 1), (2, 2), (3, 3), (0, 3)]):
+        chunks.ticks = tick
+        chunks.awake = np.zeros((4, 4), dtype=bool)
+        chunks.awake[chunk] = True
+        turns.append(
+            {material: np.argwhere(mask).tolist() for material, mask in scheduler.due(chunks)}
+        )
+    assert [list(turn) for turn in turns] == [
+        ["sand", "acid"],
+        ["sand"],
+        ["sand"],
+        ["sand", "acid"],
+        ["sand"],
+    ]
+    assert turns[1]["sand"] == [[1, 1]]
+    assert turns[3]["acid"] == [[1, 1], [2, 2], [3, 3]]
+
+
+# Sand near a time slow cell falls one cell every dilation ticks, sand
+# elsewhere falls every tick
+def test_time_dilation_slows_nearby_chunks():
+    main.new_world(128, 64, "objects", 0)
+    main.place_cell("time slow", 10, 40)
+    main.place_cell("sand", 12, 0)
+    main.place_cell("sand", 110, 0)
+    for _ in range(30):
+        main.tick()
+    sand = np.argwhere(np.asarray(main.grid) == main.SAND_LAYER).tolist()
+    assert sand == [[12, 30 // main.TimeSlow.dilation], [110, 30]]
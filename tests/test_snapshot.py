@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import main, snapshot
+from cell import validate
+from recorder import material_grid
+from conftest import ENGINES
+
+
+# A bit of everything: falling sand and water, acid on wood, fire and destroy
+def build(width, height):
+    for x in range(width):
+        main.place_cell("solid", x, height - 1)
+    for x in range(10, 40):
+        for y in range(0, 20):
+            main.place_cell("sand" if y < 10 else "water", x, y)
+    for x in range(45, 60):
+        for y in range(20, 30):
+            main.place_cell("acid", x, y)
+            main.place_cell("wood", x, y + 15)
+    for x in range(65, 85):
+        for y in range(40, 50):
+            main.place_cell("wood", x, y)
+    main.place_cell("fire", 75, 39)
+    main.place_cell("destroy", 20, height - 2)
+
+
+def materials():
+    return material_grid(main.grid.shape, main.engine)
+
+
+# Loading a snapshot gives back the world as it was saved, and running it on
+# gives the same ticks as running on without saving
+@pytest.mark.parametrize("sim_engine, sparse", ENGINES)
+def test_load_replays_the_same_ticks(tmp_path, sim_engine, sparse):
+    main.new_world(96, 64, sim_engine, 3, sparse)
+    build(96, 64)
+    for _ in range(60):
+        main.tick()
+    path = tmp_path / "world.snap"
+    main.save_world(path)
+    saved = materials()
+    for _ in range(40):
+        main.tick()
+    expected = materials()
+
+    main.load_world(path)
+    validate(main.grid)
+    assert np.array_equal(materials(), saved)
+    for _ in range(40):
+        main.tick()
+    validate(main.grid)
+    assert np.array_equal(materials(), expected)
+
+
+# A snapshot from another version of the format isn't loaded at all
+def test_other_versions_are_refused(tmp_path, monkeypatch):
+    path = tmp_path / "world.snap"
+    monkeypatch.setattr(snapshot, "VERSION", snapshot.VERSION + 1)
+    main.save_world(path)
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="version"):
+        main.load_world(path)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from sparse import ChunkedArray
+
+
+SHAPE = (70, 45)  # Not a whole number of chunks on either side
+
+
+# Does the same random writes to a ChunkedArray and a dense array, checking
+# every kind of read against the dense one after each
+@pytest.mark.parametrize("dtype, fill", [(np.int8, -1), (np.int32, 0), (np.float32, 0.5)])
+def test_matches_dense_array(dtype, fill):
+    rng = np.random.default_rng(0)
+    sparse = ChunkedArray(SHAPE, dtype, fill)
+    dense = np.full(SHAPE, fill, dtype=dtype)
+    for step in range(300):
+        value = dtype(rng.integers(0, 100))
+        x, y = (int(n) for n in rng.integers(0, SHAPE))
+        kind = step % 6
+        if kind == 0:
+            sparse[x, y] = dense[x, y] = value
+        elif kind == 1:
+            x1, y1 = x + int(rng.integers(1, 40)), y + int(rng.integers(1, 40))
+            block = rng.integers(0, 100, dense[x:x1, y:y1].shape).astype(dtype)
+            sparse[x:x1, y:y1] = dense[x:x1, y:y1] = block
+        elif kind == 2:
+            xs = rng.integers(0, SHAPE[0], 50)
+            ys = rng.integers(0, SHAPE[1], 50)
+            sparse[xs, ys] = dense[xs, ys] = value
+        elif kind == 3:
+            # Columns work like the rows of a list of lists
+            sparse[x][y : y + 3] = value
+            dense[x, y : y + 3] = value
+        elif kind == 4:
+            sparse[x:, y] = dense[x:, y] = fill
+        else:
+            sparse.release()
+
+        assert np.array_equal(np.asarray(sparse), dense)
+        assert sparse[x, y] == dense[x, y] and sparse.item(x, y) == dense[x, y]
+        assert np.array_equal(sparse[x : x + 3, y : y + 3], dense[x : x + 3, y : y + 3])
+        xs, ys = rng.integers(0, SHAPE[0], 20), rng.integers(0, SHAPE[1], 20)
+        assert np.array_equal(sparse[xs, ys], dense[xs, ys])
+
+    sparse.clear()
+    assert (np.asarray(sparse) == fill).all() and sparse.occupied() == 0
+
+
+# A window reads and writes its parent's chunks at an offset
+def test_window_shares_chunks():
+    sparse = ChunkedArray(SHAPE, np.int8, -1)
+    dense = np.full(SHAPE, -1, dtype=np.int8)
+    window = sparse.window(1, 1, (SHAPE[0] - 2, SHAPE[1] - 2))
+    window[5:30, 3] = 7
+    dense[6:31, 4] = 7
+    window[20, 20] = 9
+    dense[21, 21] = 9
+    assert np.array_equal(np.asarray(sparse), dense)
+    assert np.array_equal(np.asarray(window), dense[1:-1, 1:-1])
+
+
+# Chunks written back to the fill value are freed, the rest keep their values
+def test_release_frees_only_empty_chunks():
+    sparse = ChunkedArray(SHAPE, np.int32)
+    sparse[0:40, 0:40] = 3
+    before = sparse.occupied()
+    sparse[0:16, 0:16] = 0
+    sparse.release()
+    assert sparse.occupied() == before - 1
+    assert (sparse[16:40, 0:40] == 3).all()
+
+
+# The chunks saved from one array put back the same values in another, which
+# only gets blocks for them
+def test_state_round_trip():
+    sparse = ChunkedArray(SHAPE, np.float32, 0.5)
+    sparse[3:20, 30:44] = 2
+    sparse[60, 1] = 7
+    positions, blocks = sparse.state()
+    restored = ChunkedArray(SHAPE, np.float32, 0.5)
+    restored[40:50, 10:20] = 9
+    restored.set_state(positions, blocks)
+    assert np.array_equal(np.asarray(restored), np.asarray(sparse))
+    assert restored.occupied() == sparse.occupied()
+    restored[0, 0] = 1
+    assert restored[0, 0] == 1 and sparse[0, 0] == 0.5
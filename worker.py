@@ -0,0 +1,124 @@
+import queue, sys, threading, time
+import numpy as np
+
+
+# A finished tick as the renderer sees it
+class Frame:
+    def __init__(self, shape: tuple[int, int]) -> None:
+        self.grid = np.zeros(shape, dtype=np.int8)
+        self.rgb = np.zeros((shape[0], shape[1], 3), dtype=np.uint8)
+        self.origin = (0, 0)  # World position of the first cell in the arrays
+        self.number = -1  # Tick the frame shows (-1 = nothing yet)
+        self.tick_ms = 0.0  # How long that tick took
+
+    # Copies the part of the world that is shown into the frame (making it
+    # bigger or smaller if it changed)
+    def fill(self, grid, rgb, origin, number: int, tick_ms: float) -> None:
+        if self.grid.shape != grid.shape:
+            self.grid = np.zeros(grid.shape, dtype=np.int8)
+            self.rgb = np.zeros(rgb.shape, dtype=np.uint8)
+        np.copyto(self.grid, grid)
+        np.copyto(self.rgb, rgb)
+        self.origin = origin
+        self.number = number
+        self.tick_ms = tick_ms
+
+
+# Two frames, one the renderer reads (front) and one the simulation fills
+# Swapping them is a single attribute assignment, so neither side takes a
+# lock. The simulation never fills the frame the renderer last read; if the
+# renderer is still on it, that tick just isn't published and the next one is
+class FrameBuffer:
+    def __init__(self, shape: tuple[int, int]) -> None:
+        self.frames = [Frame(shape), Frame(shape)]
+        self.front = 0
+        self.reading = 0
+
+    # Gets the newest frame (it stays valid until the next read)
+    def read(self) -> Frame:
+        index = self.front
+        self.reading = index
+        return self.frames[index]
+
+    # Gets the frame to fill, or None if the renderer is still reading it
+    def back(self):
+        index = 1 - self.front
+        return None if self.reading == index else self.frames[index]
+
+    def publish(self, frame: Frame) -> None:
+        self.front = self.frames.index(frame)
+
+
+# Runs the simulation on its own thread so a slow tick doesn't hold up
+# drawing and input
+# Edits are sent as commands and applied between ticks by the simulation
+# thread, which is the only one that touches the world while it runs
+# handle(command) applies a command, step() runs one tick, paint() gets the
+# (grid, rgb, origin) of the area to show and interval() gets the time between
+# ticks in milliseconds
+class SimWorker:
+    def __init__(self, shape, handle, step, paint, interval) -> None:
+        self.frames = FrameBuffer(shape)
+        self.commands = queue.Queue()
+        self.handle = handle
+        self.step = step
+        self.paint = paint
+        self.interval = interval
+        self.ticks = 0
+        self.stopping = threading.Event()
+        self.error = None  # Exception that stopped the thread
+        self.thread = threading.Thread(target=self.run, name="simulation", daemon=True)
+
+    def start(self) -> None:
+        # Hand the interpreter back and forth more often so the render loop
+        # isn't left waiting behind a long stretch of pure Python tick code
+        sys.setswitchinterval(0.001)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        self.commands.put(None)  # Wakes the thread if it's waiting
+        self.thread.join()
+
+    def send(self, command: tuple) -> None:
+        self.commands.put(command)
+
+    # Raises the exception that stopped the thread, if there was one
+    def check(self) -> None:
+        if self.error is not None:
+            raise RuntimeError("simulation thread stopped") from self.error
+
+    def run(self) -> None:
+        try:
+            next_tick = time.perf_counter()
+            while not self.stopping.is_set():
+                wait = next_tick - time.perf_counter()
+                if wait > 0:
+                    try:
+                        self._handle(self.commands.get(timeout=wait))
+                    except queue.Empty:
+                        pass
+                    continue
+
+                # Edits made since the last tick go in before it
+                while True:
+                    try:
+                        self._handle(self.commands.get_nowait())
+                    except queue.Empty:
+                        break
+                start = time.perf_counter()
+                self.step()
+                tick_ms = (time.perf_counter() - start) * 1000
+                self.ticks += 1
+                # Changes pile up until there is a free frame to paint them in
+                frame = self.frames.back()
+                if frame is not None:
+                    frame.fill(*self.paint(), self.ticks, tick_ms)
+                    self.frames.publish(frame)
+                next_tick = start + self.interval() / 1000
+        except BaseException as error:
+            self.error = error
+
+    def _handle(self, command) -> None:
+        if command is not None and not self.stopping.is_set():
+            self.handle(command)